@@ -1,13 +1,55 @@
+import importlib
+import importlib.util
 import logging
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .client import Aiopulse
+    from .factory import RequestFactory
+    from .mapping import RequestBuildMapping
+    from .monitor import LoopMonitor
+    from .progress import ProgressTracker
+    from .queue import RequestQueue
+    from .request import Request
+    from .response import ProcessedResponse
+    from .schema import GenericInputSchema, InputSchemaBase
+    from .session import SessionConfig
+    from .transformer import TransformerBase
+
+# Public names and the submodule defining them. Submodules (and aiohttp, pydantic and yarl with them) are only imported on first access.
+_EXPORTS = {
+    "Aiopulse": "client",
+    "RequestFactory": "factory",
+    "RequestBuildMapping": "mapping",
+    "LoopMonitor": "monitor",
+    "ProgressTracker": "progress",
+    "RequestQueue": "queue",
+    "Request": "request",
+    "ProcessedResponse": "response",
+    "GenericInputSchema": "schema",
+    "InputSchemaBase": "schema",
+    "SessionConfig": "session",
+    "TransformerBase": "transformer",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str) -> Any:
+    module = _EXPORTS.get(name)
+    if module is None:
+        # Submodules like `aiopulse.response` are imported on first access too
+        if not name.startswith("_") and importlib.util.find_spec(f"{__name__}.{name}") is not None:
+            return importlib.import_module(f".{name}", __name__)
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
 
-from .client import Aiopulse
-from .factory import RequestFactory
-from .mapping import RequestBuildMapping
-from .queue import RequestQueue
-from .request import Request
-from .response import ProcessedResponse
-from .schema import GenericInputSchema, InputSchemaBase
-from .transformer import TransformerBase
 
 logger = logging.getLogger(__name__)
 logger.addHandler(logging.NullHandler())
@@ -1,30 +1,90 @@
 import asyncio
 import logging
-from typing import Any
+import time
+from typing import Any, Callable
 
 import aiohttp
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 
+from .data_types import IdAllocator
 from .factory import RequestFactory
 from .mapping import RequestBuildMapping
-from .queue import RequestQueue
+from .monitor import LoopMonitor, LoopStats
+from .progress import ProgressSnapshot, ProgressTracker
+from .queue import Fairness, RequestQueue
 from .request import Request
 from .response import ProcessedResponse
+from .session import SessionConfig, SessionManager
+from .transport import HttpTransport
 
 
 class ProcessingResult(BaseModel):
+    model_config = ConfigDict(defer_build=True)
+
     request: Request
     response: ProcessedResponse
 
 
+ResultCallback = Callable[[ProcessingResult], Any]
+
+
 class Aiopulse:
     logger = logging.getLogger(__name__)
 
-    def __init__(self) -> None:
-        self.queue = RequestQueue()
-        self.factory = RequestFactory()
+    def __init__(
+        self,
+        monitor: LoopMonitor | None = None,
+        session_config: SessionConfig | None = None,
+        compact_queue: bool = False,
+        transport: HttpTransport | None = None,
+        id_allocator: IdAllocator | None = None,
+        progress: ProgressTracker | None = None,
+        priority: bool = False,
+        fairness: Fairness | None = "mapping",
+        chain_first: bool = False,
+    ) -> None:
+        self.queue = RequestQueue(compact=compact_queue, priority=priority, fairness=fairness, chain_first=chain_first, progress=progress)
+        self.progress = progress
+        self.factory = RequestFactory(id_allocator=id_allocator)
+        self.monitor = monitor
+        self.sessions = SessionManager(session_config)
+        self.transport = transport or HttpTransport()
+        self.last_results: list[ProcessingResult] = []
+        self._resumed = asyncio.Event()
+        self._resumed.set()
+        self._draining = False
+        self._cancelled = False
+        self._inflight: set[asyncio.Task] = set()
         self.logger.debug("Aiopulse client initialized")
 
+    async def __aenter__(self) -> "Aiopulse":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        """Close the managed session, if one was opened, and the transport."""
+        await self.sessions.close()
+        await self.transport.close()
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        """Return the managed session, creating and optionally pre-warming it on first use."""
+        if self.sessions.session is None:
+            session = await self.sessions.get_session()
+            if self.sessions.config.prewarm:
+                await self.prewarm_connections()
+            return session
+        return await self.sessions.get_session()
+
+    async def prewarm_connections(self) -> int:
+        """Open connections to the hosts found in the transformer arguments and to `SessionConfig.prewarm_hosts`.
+
+        Returns:
+            int: Number of hosts successfully connected to
+        """
+        return await self.sessions.prewarm([*self.factory.known_hosts(), *self.sessions.config.prewarm_hosts])
+
     def register_mapping(self, mapping: RequestBuildMapping) -> None:
         self.factory.register_mapping(mapping)
 
@@ -34,10 +94,96 @@ class Aiopulse:
     def set_transformer_args(self, mapping_title: str, **args: dict[str, Any]) -> None:
         self.factory.set_transformer_args(mapping_title, **args)
 
-    async def process_queue(self, session: aiohttp.ClientSession, batch_size: int, timeout: int = 60) -> list[ProcessingResult]:
+    @property
+    def paused(self) -> bool:
+        return not self._resumed.is_set()
+
+    def pause(self) -> None:
+        """Stop dequeuing new batches once the in-flight batch completes, until `resume` is called."""
+        self.logger.info("Pausing queue processing")
+        self._resumed.clear()
+
+    def resume(self) -> None:
+        self.logger.info("Resuming queue processing")
+        self._resumed.set()
+
+    def drain(self) -> None:
+        """Let in-flight requests finish, then stop `process_queue` without dequeuing anything else. Queued requests are left in the queue."""
+        self.logger.info("Draining queue processing")
+        self._draining = True
+        self._resumed.set()
+
+    def cancel(self) -> None:
+        """Cancel in-flight requests and stop `process_queue`. Its return value holds the partial results: the requests completed before cancelling,
+        and the cancelled ones reported as failed with the error `Cancelled`. Dependent requests of cancelled requests are not sent.
+        """
+        self.logger.info("Cancelling queue processing. %s requests in flight", len(self._inflight))
+        self._cancelled = True
+        for task in self._inflight:
+            task.cancel()
+        self._resumed.set()
+
+    def progress_snapshot(self) -> ProgressSnapshot | None:
+        """Return the job progress gathered by the tracker, or `None` if the client has no tracker."""
+        return self.progress.snapshot() if self.progress else None
+
+    def loop_stats(self) -> LoopStats | None:
+        """Return the event loop statistics gathered by the monitor, or `None` if the client has no monitor."""
+        return self.monitor.stats() if self.monitor else None
+
+    async def process_queue(
+        self,
+        session: aiohttp.ClientSession | None = None,
+        batch_size: int = 10,
+        timeout: int = 60,
+        on_result: ResultCallback | None = None,
+        deadline: float | None = None,
+        keep_results: bool = True,
+    ) -> list[ProcessingResult]:
+        """Send every queued request in batches of `batch_size`, adding chained requests as their dependencies complete.
+
+        Args:
+            session (aiohttp.ClientSession | None, optional): The session used to send requests. Defaults to the session managed by the client, which is reused across calls.
+            batch_size (int, optional): Maximum number of requests sent concurrently. Defaults to 10.
+            timeout (int, optional): Total timeout in seconds for each request. Defaults to 60.
+            on_result (ResultCallback | None, optional): Called with each `ProcessingResult` as soon as its request completes, so in completion order. Defaults to None.
+            deadline (float | None, optional): Time budget in seconds for the whole job. Requests still queued when it runs out are skipped, and in-flight requests are cut off. Defaults to None.
+            keep_results (bool, optional): Keep every result in the returned list and `last_results`. Disable it when results are consumed through `on_result`, so long jobs don't hold them all in memory. Defaults to True.
+
+        Processing can be controlled while it runs with `pause`, `resume`, `drain` and `cancel`. If the task running `process_queue` is itself cancelled,
+        in-flight requests are cancelled and cleaned up before the cancellation propagates, and the results of requests that finished are kept in `last_results`.
+
+        Returns:
+            list[ProcessingResult]: The results of all requests sent, batch by batch in the order they were dequeued, or an empty list if `keep_results` is disabled
+        """
         self.logger.info(f"Triggering queue processing. Batch size = {batch_size}")
+        job_deadline = time.monotonic() + deadline if deadline is not None else None
+        if session is None:
+            session = await self.get_session()
+        if self.monitor:
+            self.monitor.start()
+        if self.progress:
+            self.progress.start()
+        try:
+            return await self._process_queue(session, batch_size, timeout, on_result, job_deadline, keep_results)
+        finally:
+            if self.monitor:
+                await self.monitor.stop()
+            if self.progress:
+                self.progress.report()
+
+    async def _process_queue(
+        self, session: aiohttp.ClientSession, batch_size: int, timeout: int, on_result: ResultCallback | None, job_deadline: float | None, keep_results: bool
+    ) -> list[ProcessingResult]:
         results: list[ProcessingResult] = []
+        self.last_results = results
+        self._draining = False
+        self._cancelled = False
         while True:
+            await self._resumed.wait()
+            if self._draining or self._cancelled:
+                self.logger.info("Stopped dequeuing requests. %s requests left in queue.", self.queue.request_count())
+                break
             batch: list[Request] = []
             for _ in range(batch_size):
                 try:
@@ -48,39 +194,108 @@ class Aiopulse:
             if not batch:
                 self.logger.info("No more requests to send.")
                 break
-            tasks = [asyncio.create_task(self.send(session, request, timeout)) for request in batch]
-            processed_responses: list[ProcessedResponse] = await asyncio.gather(*tasks)
+            if job_deadline is not None:
+                for request in batch:
+                    request.deadline = job_deadline if request.deadline is None else min(request.deadline, job_deadline)
+            tasks = {asyncio.create_task(self.send(session, request, timeout)): request for request in batch}
+            self._inflight.update(tasks)
+            unrecorded = dict(tasks)
+            finished: dict[asyncio.Task, ProcessingResult] = dict()
+            try:
+                pending = set(tasks)
+                while pending:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    # Record each result as soon as its request finishes, so `on_result` gets it right away and it is kept if processing is interrupted
+                    for task in [task for task in tasks if task in done]:
+                        request = tasks[task]
+                        response = self._outcome(task)
+                        del unrecorded[task]
+                        finished[task] = self._record(request, response, on_result)
+                        if response.ok:
+                            # Add deferred requests that depend on this response if any
+                            try:
+                                await self.queue.add_deferred(self.factory, request.id, response.pass_to_dependency)
+                            except ValueError as err:
+                                self.logger.warning("Failed to add dependent requests for request id %s. Error: %s.", request.id, err)
+            except BaseException:
+                # Cancelled, or a response processor raised: stop the rest of the batch, keeping what already finished
+                for task in unrecorded:
+                    task.cancel()
+                await asyncio.gather(*unrecorded, return_exceptions=True)
+                for task, request in unrecorded.items():
+                    if not task.cancelled() and task.exception() is None:
+                        finished[task] = self._record(request, task.result(), on_result)
+                    elif self.progress:
+                        # Dequeued requests that will never get a result still leave the in-flight count
+                        self.progress.completed(request.mapping_title, ok=False)
+                raise
+            finally:
+                self._inflight.difference_update(tasks)
+                if keep_results:
+                    # Results are returned in the order requests were dequeued, whatever order they completed in
+                    results.extend(finished[task] for task in tasks if task in finished)
             self.logger.info("Finished request batch.")
-            for i, response in enumerate(processed_responses):
-                request = batch[i]
-
-                if response.ok:
-                    # Add new requests created by the response processor
-                    if response.chain:
-                        self.logger.info("Adding chained requests created by request id %s", request.id)
-                        self.queue.defer(response.chain, request.id)
-                    # Add deferred requests that depend on this response if any
-                    try:
-                        await self.queue.add_deferred(self.factory, request.id, response.pass_to_dependency)
-                    except ValueError as err:
-                        self.logger.warning("Failed to add dependent requests for request id %s. Error: %s.", request.id, err)
-
-                # Do not process dependent requests if there has been an error
-                else:
-                    self.logger.warning("Request with id %s failed. Any dependent requests will be skipped.", request.id)
-
-                results.append(ProcessingResult(request=request, response=response))
 
         return results
 
+    def _record(self, request: Request, response: ProcessedResponse, on_result: ResultCallback | None) -> ProcessingResult:
+        if response.ok:
+            # Add new requests created by the response processor
+            if response.chain:
+                self.logger.info("Adding chained requests created by request id %s", request.id)
+                self.queue.defer(response.chain, request.id, request.deadline)
+        # Do not process dependent requests if there has been an error
+        else:
+            self.logger.warning("Request with id %s failed. Any dependent requests will be skipped.", request.id)
+            self.queue.skip_deferred(request.id)
+
+        if self.progress:
+            self.progress.completed(request.mapping_title, response.ok)
+
+        result = ProcessingResult(request=request, response=response)
+        if on_result:
+            on_result(result)
+        return result
+
+    def _outcome(self, task: asyncio.Task) -> ProcessedResponse:
+        # Tasks cancelled through `cancel` are reported as failed instead of interrupting the whole batch
+        if task.cancelled():
+            return ProcessedResponse(error="Cancelled", ok=False, content=[])
+        return task.result()
+
     async def send(self, session: aiohttp.ClientSession, request: Request, timeout: int = 60) -> ProcessedResponse:
+        remaining = request.remaining_time()
+        if remaining is not None:
+            if remaining <= 0:
+                self.logger.warning("Request id %s skipped: deadline exceeded", request.id)
+                return ProcessedResponse(error="Deadline exceeded", ok=False, content=[])
+            timeout = min(timeout, remaining)  # type: ignore
         params = request.prepare()
         self.logger.info(f"Sending {request.method} request with id {request.id} to {request.url}...")
+        resp: aiohttp.ClientResponse | None = None
         try:
-            resp = await session.request(timeout=aiohttp.ClientTimeout(total=timeout), **params)
+            started = time.perf_counter()
+            resp = await self.transport.request(session, timeout, params)
+            if self.monitor:
+                # Download the body up front, so it counts as network time rather than processor time. aiohttp keeps it for the processor
+                await resp.read()
+            received = time.perf_counter()
             self.logger.info("Request id %s successful. Processing response...", request.id)
-            return await request.process_response(resp)
-        except aiohttp.ClientError as err:
+            processed = await request.process_response(resp)
+            if self.monitor:
+                self.monitor.record_network(received - started)
+                self.monitor.record_processor(time.perf_counter() - received)
+            return processed
+        except (aiohttp.ClientError, asyncio.TimeoutError) as err:
             msg = f"{type(err).__name__}: {str(err)}"
             self.logger.error("Request id %s failed with error '%s'", request.id, msg)
             return ProcessedResponse(error=msg, ok=False, content=[])
+        except BaseException:
+            # Don't return a half-read connection to the pool
+            if resp is not None:
+                resp.close()
+                resp = None
+            raise
+        finally:
+            if resp is not None:
+                resp.release()
@@ -1,5 +1,7 @@
+import functools
+import threading
 from enum import StrEnum, auto
-from typing import Any
+from typing import Any, Callable, Iterator, Mapping
 
 from pydantic import GetCoreSchemaHandler, GetJsonSchemaHandler
 from pydantic.json_schema import JsonSchemaValue
@@ -18,10 +20,14 @@ class SerializableURL(URL):  # type: ignore
         _handler: GetCoreSchemaHandler,
     ) -> CoreSchema:
         def _validate(value: str | URL | SerializableURL) -> SerializableURL:
-            try:
-                return SerializableURL(value)
-            except TypeError as err:
-                raise ValueError("Cannot construct URL from a type other than str") from err
+            if isinstance(value, SerializableURL):
+                return value
+            if isinstance(value, str):
+                return parse_url(value)
+            # URL helpers like `join_url` return plain URLs, which yarl won't convert to a subclass
+            if isinstance(value, URL):
+                return plain_url(value)  # type: ignore
+            raise ValueError("Cannot construct URL from a type other than str or URL")
 
         return core_schema.no_info_plain_validator_function(
             function=_validate,
@@ -33,6 +39,78 @@ class SerializableURL(URL):  # type: ignore
         return handler(core_schema.url_schema())
 
 
+URL_CACHE_SIZE = 1024
+
+
+class _LRUCachedFunction:
+    """Bounded LRU cache around a function, which can be resized at runtime."""
+
+    def __init__(self, func: Callable[..., Any], maxsize: int) -> None:
+        self._func = func
+        self.resize(maxsize)
+        functools.update_wrapper(self, func)
+
+    def resize(self, maxsize: int) -> None:
+        self._cached = functools.lru_cache(maxsize=maxsize)(self._func)
+
+    def cache_info(self) -> functools._CacheInfo:
+        return self._cached.cache_info()
+
+    def cache_clear(self) -> None:
+        self._cached.cache_clear()
+
+    def __call__(self, *args: Any) -> Any:
+        return self._cached(*args)
+
+
+def _parse_url(value: str) -> SerializableURL:
+    """Parse a string into a `SerializableURL`. URLs are immutable, so parsed instances are shared."""
+    return SerializableURL(value)
+
+
+def _join_url(base: URL, path: str) -> URL:
+    """Append an encoded relative path to a base URL."""
+    return base.joinpath(path, encoded=True)  # type: ignore
+
+
+def _append_url_path(url: URL, path: str) -> URL:
+    """Append a raw path to the path of a URL, keeping its query string."""
+    return url.with_path(url.path + path) % url.query_string
+
+
+parse_url = _LRUCachedFunction(_parse_url, URL_CACHE_SIZE)
+join_url = _LRUCachedFunction(_join_url, URL_CACHE_SIZE)
+append_url_path = _LRUCachedFunction(_append_url_path, URL_CACHE_SIZE)
+_URL_CACHES = {"parse": parse_url, "join": join_url, "append_path": append_url_path}
+
+
+def url_cache_info() -> dict[str, functools._CacheInfo]:
+    """Hits, misses and sizes of the URL caches, to help sizing them."""
+    return {name: cache.cache_info() for name, cache in _URL_CACHES.items()}
+
+
+def set_url_cache_size(maxsize: int) -> None:
+    """Resize (and clear) all URL caches."""
+    for cache in _URL_CACHES.values():
+        cache.resize(maxsize)
+
+
+def plain_url(url: URL) -> URL:
+    """Return `url` as a plain `yarl.URL`, which is what aiohttp expects (and what `URL.__eq__` compares against)."""
+    if type(url) is URL:
+        return url
+    return URL(str(url), encoded=True)
+
+
+def with_query_params(url: URL, params: Mapping[str, str]) -> URL:
+    """Add query parameters to a URL, skipping the merge with existing parameters when the URL has none. Always returns a plain `yarl.URL`."""
+    if not params:
+        return plain_url(url)
+    if not url.raw_query_string:
+        return url.with_query(params)
+    return url.update_query(params)
+
+
 class Counter:
     _counter: int = 0
 
@@ -41,6 +119,75 @@ class Counter:
         return Counter._counter
 
 
+# The sign bit stays clear, so ids fit signed 64-bit integer columns and arrays
+SHARD_BITS = 15
+SEQUENCE_BITS = 63 - SHARD_BITS
+MAX_SHARD = (1 << SHARD_BITS) - 1
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+
+
+def split_id(id: int) -> tuple[int, int]:
+    """Split an id allocated by `IdAllocator` into its shard and sequence number."""
+    return id >> SEQUENCE_BITS, id & MAX_SEQUENCE
+
+
+class IdAllocator:
+    """Allocate request ids that are unique across clients, threads and processes, packed into a positive signed 64-bit integer.
+
+    The high `SHARD_BITS` bits hold the shard and the low `SEQUENCE_BITS` bits a sequence number. Every allocator of a shard in the process
+    reserves blocks of `block_size` sequence numbers from a shared source under a lock, then hands them out without locking,
+    so several clients can share a shard. Different processes must use different shards. Shard 0 is left to the process-local ids `Counter`
+    assigns by default, so the two never collide.
+
+    To resume a run without reusing ids, pass the highest id it allocated as `start`.
+
+    Args:
+        shard (int): Shard prefix, between 1 and `MAX_SHARD`
+        block_size (int, optional): Sequence numbers reserved at a time. Defaults to 4096.
+        start (int, optional): An id already in use. Ids are allocated after it if it belongs to the same shard. Defaults to 0.
+    """
+
+    _next_sequence: dict[int, int] = {}
+    _lock = threading.Lock()
+
+    def __init__(self, shard: int, block_size: int = 4096, start: int = 0) -> None:
+        if not 1 <= shard <= MAX_SHARD:
+            raise ValueError(f"Shard must be between 1 and {MAX_SHARD}")
+        if block_size < 1:
+            raise ValueError("Block size must be at least 1")
+        self.shard = shard
+        self.block_size = block_size
+        self._prefix = shard << SEQUENCE_BITS
+        self._ids: Iterator[int] = iter(())
+        if start:
+            self.advance(start)
+
+    def advance(self, last_id: int) -> None:
+        """Make sure ids allocated from now on come after `last_id`, e.g. the highest id of a checkpoint. Ids of other shards are ignored."""
+        shard, sequence = split_id(last_id)
+        if shard != self.shard:
+            return
+        with IdAllocator._lock:
+            IdAllocator._next_sequence[shard] = max(IdAllocator._next_sequence.get(shard, 1), sequence + 1)
+        self._ids = iter(())
+
+    def _reserve_block(self) -> Iterator[int]:
+        with IdAllocator._lock:
+            first = IdAllocator._next_sequence.get(self.shard, 1)
+            last = min(first + self.block_size, MAX_SEQUENCE + 1)
+            if first > MAX_SEQUENCE:
+                raise ValueError(f"Ran out of ids for shard {self.shard}")
+            IdAllocator._next_sequence[self.shard] = last
+        return iter(range(self._prefix + first, self._prefix + last))
+
+    def __call__(self) -> int:
+        try:
+            return next(self._ids)
+        except StopIteration:
+            self._ids = self._reserve_block()
+            return next(self._ids)
+
+
 class Method(StrEnum):
     """
     HTTP methods enum
@@ -58,3 +205,12 @@ class Method(StrEnum):
         for member in cls:
             if member.lower() == value.lower():
                 return member
+
+
+class Compression(StrEnum):
+    """
+    Request body compression algorithms
+    """
+
+    GZIP = auto()
+    ZSTD = auto()
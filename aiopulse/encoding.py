@@ -0,0 +1,60 @@
+import asyncio
+import zlib
+from pathlib import Path
+from typing import Any, AsyncIterable, AsyncIterator
+
+from .data_types import Compression
+
+try:
+    from compression import zstd as _zstd  # type: ignore - Python >= 3.14
+
+    def _zstd_compressor() -> Any:
+        return _zstd.ZstdCompressor()
+
+except ImportError:
+    try:
+        import zstandard as _zstd  # type: ignore
+
+        def _zstd_compressor() -> Any:
+            return _zstd.ZstdCompressor().compressobj()
+
+    except ImportError:
+        _zstd = None
+
+CHUNK_SIZE = 64 * 1024
+
+
+def zstd_available() -> bool:
+    """Whether zstd compression is supported (Python >= 3.14 or the `zstandard` package)."""
+    return _zstd is not None
+
+
+def _compressor(method: Compression) -> Any:
+    if method == Compression.GZIP:
+        return zlib.compressobj(wbits=31)
+    if not zstd_available():
+        raise ValueError("zstd compression requires Python >= 3.14 or the 'zstandard' package")
+    return _zstd_compressor()
+
+
+def compress(data: bytes | memoryview, method: Compression) -> bytes:
+    """Compress a complete request body."""
+    compressor = _compressor(method)
+    return compressor.compress(data) + compressor.flush()
+
+
+async def compress_stream(chunks: AsyncIterable[bytes], method: Compression) -> AsyncIterator[bytes]:
+    """Compress a stream of chunks incrementally, so only one chunk is held in memory at a time."""
+    compressor = _compressor(method)
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+async def file_chunks(path: Path, chunk_size: int = CHUNK_SIZE) -> AsyncIterator[bytes]:
+    """Read a file in chunks without blocking the event loop."""
+    with open(path, "rb") as f:
+        while chunk := await asyncio.to_thread(f.read, chunk_size):
+            yield chunk
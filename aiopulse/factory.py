@@ -1,11 +1,67 @@
+import asyncio
+import itertools
+import json
 import logging
-from typing import Any
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Iterable, Iterator
 
-from pydantic import ValidationError
+from pydantic import BaseModel, ConfigDict, ValidationError
+from yarl import URL
 
+from .data_types import Counter, IdAllocator
+from .encoding import compress
 from .mapping import RequestBuildMapping
-from .request import Request
-from .transformer import TransformerBase
+from .record import QueuedRequest
+from .request import Request, encode_json
+from .transformer import CompiledPipeline, TransformerBase
+
+_next_request_id = Counter()
+
+
+class BuildError(BaseModel):
+    """A payload that couldn't be built.
+
+    Attributes:
+        index (int): Position of the payload in the input
+        error (str): Why it failed
+    """
+
+    index: int
+    error: str
+
+
+class BulkBuildResult(BaseModel):
+    """Outcome of `RequestFactory.build_bulk`.
+
+    Attributes:
+        requests (dict[int, QueuedRequest]): Compact requests keyed by the position of their payload in the input, in input order
+        errors (list[BuildError]): Payloads that failed to build
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    requests: dict[int, QueuedRequest]
+    errors: list[BuildError]
+
+
+BuiltChunk = tuple[list[tuple[int, tuple]], list[BuildError]]
+
+_worker_factory: "RequestFactory | None" = None
+
+
+def _init_bulk_worker(mappings: list[RequestBuildMapping], transformer_args: dict[str, Any], preserialize_bodies: bool) -> None:
+    global _worker_factory
+    _worker_factory = RequestFactory(preserialize_bodies=preserialize_bodies)
+    _worker_factory.transformer_args = transformer_args
+    for mapping in mappings:
+        _worker_factory.register_mapping(mapping)
+
+
+def _build_chunk(chunk: list[tuple[int, dict[str, Any]]], extra_input_args: dict[str, Any]) -> BuiltChunk:
+    return _worker_factory._build_chunk(chunk, extra_input_args)  # type: ignore
 
 
 class RequestFactory:
@@ -14,30 +70,89 @@ class RequestFactory:
     Attributes:
         `mappings` (list[RequestFactoryMapping]): A list of registered mappings. The order of insertion matters, since they are checked one by one when building a new `Request`
         `transformer_args`: A dictionary containing arguments to be passed to the transformer constructors
+        `preserialize_bodies` (bool): Encode request bodies to JSON bytes once, when the request is built, instead of at send time
+        `serialize_in_thread` (bool): When pre-serializing through `build_request_async`, encode bodies in a worker thread to keep the event loop free
+        `id_allocator` (IdAllocator | None): Assigns ids unique across processes to built requests. Without one, requests get process-local ids
+        `stage_timings` (dict[str, float] | None): If set, seconds spent in each build stage are added to it, keyed by stage name (see `aiopulse.profiling.STAGES`)
 
     Methods:
         `register_mapping`: register new mappings.
         `build_request`: check if data matches any of the registered mappings and return a new Request
+        `catalog` / `catalog_bytes`: describe the registered mappings and their input schemas, as cached objects or a cached JSON payload
     """
 
     mappings: list[RequestBuildMapping]
 
-    def __init__(self) -> None:
+    def __init__(self, preserialize_bodies: bool = False, serialize_in_thread: bool = False, id_allocator: IdAllocator | None = None) -> None:
         self.logger = logging.getLogger(__name__)
         self.mappings = []
+        self._pipelines: dict[int, tuple[RequestBuildMapping, CompiledPipeline]] = dict()
+        self._catalog: tuple[tuple, list[dict[str, Any]], bytes] | None = None
         self.transformer_args = dict()
+        self.preserialize_bodies = preserialize_bodies
+        self.serialize_in_thread = serialize_in_thread
+        self.id_allocator = id_allocator
+        self.stage_timings: dict[str, float] | None = None
         self.logger.debug("RequestFactory initialized.")
 
+    @property
+    def transformer_args(self) -> dict[str, Any]:
+        return self._transformer_args
+
+    @transformer_args.setter
+    def transformer_args(self, transformer_args: dict[str, Any]) -> None:
+        self._transformer_args = transformer_args
+        self._pipelines.clear()
+
     def register_mapping(self, mapping: RequestBuildMapping) -> None:
-        """Register a new  mapping.
+        """Register a new  mapping and compile its transformer pipeline.
+
+        If the transformers can't be instantiated yet (e.g. their arguments are set later with `set_transformer_args`), compilation is retried when the first request is built.
 
         Args:
             mapping (RequestBuildMapping): An object containing schema+transformer+response_processor+matcher - all the parts needed to build a new request
         """
         self.logger.info(f"New request mapping: {mapping}")
         self.mappings.append(mapping)
+        try:
+            self.compiled_pipeline(mapping)
+        except Exception as err:
+            self.logger.debug("Deferred compiling the transformers of mapping '%s'. %s: %s", mapping.title, type(err).__name__, err)
+        self._refresh_catalog()
+
+    def _refresh_catalog(self) -> tuple[list[dict[str, Any]], bytes]:
+        # Keyed on what the entries are made of, so mappings appended or edited in place also invalidate the catalog
+        key = tuple((id(mapping), mapping.title, mapping.description, mapping.input_schema) for mapping in self.mappings)
+        if self._catalog is None or self._catalog[0] != key:
+            entries = [mapping.get_input_schema() for mapping in self.mappings]
+            self._catalog = (key, entries, json.dumps(entries, separators=(",", ":")).encode())
+            self.logger.debug("Rebuilt the mapping catalog with %s mappings", len(entries))
+        return self._catalog[1], self._catalog[2]
+
+    def catalog(self) -> list[dict[str, Any]]:
+        """List the title, description and input JSON schema of every registered mapping, in registration order.
+
+        The list is computed when mappings are registered and cached, so it is shared between calls and must not be modified.
+        """
+        return self._refresh_catalog()[0]
+
+    def catalog_bytes(self) -> bytes:
+        """The `catalog` serialized to compact UTF-8 JSON, ready to be served as-is. Cached like `catalog`."""
+        return self._refresh_catalog()[1]
 
-    def build_request(self, data: dict[str, Any], extra_input_args: dict[str, Any] = dict()) -> Request:
+    def compiled_pipeline(self, mapping: RequestBuildMapping) -> CompiledPipeline:
+        """Return the compiled transformer pipeline of a mapping, compiling it on first use.
+
+        Pipelines are recompiled whenever the transformer arguments change, including when they are edited in place.
+        """
+        compiled, pipeline = self._pipelines.get(id(mapping), (None, None))
+        if compiled is not mapping or pipeline is None or pipeline.transformers != mapping.transformers or pipeline.transformer_args != self.transformer_args:
+            pipeline = CompiledPipeline(mapping.transformers, self.transformer_args)
+            self._pipelines[id(mapping)] = (mapping, pipeline)
+            self.logger.debug("Compiled %s transformers of mapping '%s' into %s steps", len(mapping.transformers), mapping.title, len(pipeline.steps))
+        return pipeline
+
+    def build_request(self, data: dict[str, Any], extra_input_args: dict[str, Any] = dict(), serialize: bool = True, deadline: float | None = None) -> Request:
         """Checks if the input data matches any previously registered mappings and builds a new `Request` after being validated/transformed.
 
         Note that the order of mapping registration is important, as they are checked one by one in insertion order until a match is found.
@@ -45,6 +160,8 @@ class RequestFactory:
         Args:
             data (dict[str, Any]): A dictionary with the raw input data.
             extra_input_args (dict[str, Any], optional): Additional input arguments to be passed to the input schema. Defaults to an empty dictionary.
+            serialize (bool, optional): Pre-serialize the body if `preserialize_bodies` is enabled. Defaults to True.
+            deadline (float | None, optional): Deadline inherited from a parent request, as a `time.monotonic()` timestamp. The request gets the earliest of this and its own budget. Defaults to None.
 
         Raises:
             ValueError: If the data doesn't match any of the mappings, the input data doesn't pass validation, or the transformation fails.
@@ -52,16 +169,44 @@ class RequestFactory:
         Returns:
             Request: A new `Request` instance.
         """
+        return self._build(data, extra_input_args, serialize, deadline)[1]
+
+    def _build(self, data: dict[str, Any], extra_input_args: dict[str, Any], serialize: bool, deadline: float | None = None) -> tuple[RequestBuildMapping, Request]:
         self.logger.info("Building request...")
+        timed = self.stage_timings is not None
+        lap = time.perf_counter() if timed else 0.0
         try:
-            for mapping in self.mappings:
-                if mapping.is_match(data):
-                    self.logger.info(f"Mapping {mapping} matched request data")
-                    input_data = mapping.input_schema(**data | extra_input_args)
-                    transformed_data = self.apply_transforms(input_data.model_dump(exclude={"chain"}), mapping.transformers)
-                    request = Request(response_processor=mapping.response_processor, **transformed_data)
-                    self.logger.info("New request (id %s) successfully created", request.id)
-                    return request
+            mapping = self.match_mapping(data)
+            if timed:
+                lap = self._lap("match", lap)
+            if mapping:
+                self.logger.info(f"Mapping {mapping} matched request data")
+                input_data = mapping.input_schema(**data | extra_input_args)
+                if timed:
+                    lap = self._lap("validate", lap)
+                dumped = input_data.model_dump(exclude={"chain"})
+                if timed:
+                    lap = self._lap("dump", lap)
+                transformed_data = self.compiled_pipeline(mapping)(dumped)
+                if timed:
+                    lap = self._lap("transform", lap)
+                if mapping.compression:
+                    transformed_data.setdefault("compression", mapping.compression)
+                transformed_data.setdefault("priority", data.get("priority", mapping.priority))
+                transformed_data.setdefault("tenant", data.get("tenant"))
+                transformed_data["mapping_title"] = mapping.title
+                transformed_data["deadline"] = self._deadline(data.get("deadline", mapping.deadline), deadline)
+                request = Request(response_processor=mapping.response_processor, **transformed_data)
+                if self.id_allocator is not None:
+                    request.id = self.id_allocator()
+                if timed:
+                    lap = self._lap("request", lap)
+                if serialize and self.preserialize_bodies:
+                    self._serialize_body(request)
+                if timed:
+                    self._lap("serialize", lap)
+                self.logger.info("New request (id %s) successfully created", request.id)
+                return mapping, request
 
         except Exception as err:
             if isinstance(err, ValidationError):
@@ -73,6 +218,147 @@ class RequestFactory:
         self.logger.warning("Data didn't match any registered schemas")
         raise ValueError("Data didn't match any registered schemas")
 
+    async def build_request_async(self, data: dict[str, Any], extra_input_args: dict[str, Any] = dict(), deadline: float | None = None) -> Request:
+        """Same as `build_request`, but pre-serializes the body in a worker thread if `serialize_in_thread` is enabled.
+
+        Args:
+            data (dict[str, Any]): A dictionary with the raw input data.
+            extra_input_args (dict[str, Any], optional): Additional input arguments to be passed to the input schema. Defaults to an empty dictionary.
+            deadline (float | None, optional): Deadline inherited from a parent request, as a `time.monotonic()` timestamp. Defaults to None.
+
+        Returns:
+            Request: A new `Request` instance.
+        """
+        return (await self._build_async(data, extra_input_args, deadline))[1]
+
+    async def build_record_async(self, data: dict[str, Any], extra_input_args: dict[str, Any] = dict(), deadline: float | None = None) -> QueuedRequest:
+        """Same as `build_request_async`, but returns a compact `QueuedRequest` record instead of keeping the full `Request` model.
+
+        The request is still fully validated, so errors are raised at build time rather than when the request is dispatched.
+
+        Args:
+            data (dict[str, Any]): A dictionary with the raw input data.
+            extra_input_args (dict[str, Any], optional): Additional input arguments to be passed to the input schema. Defaults to an empty dictionary.
+            deadline (float | None, optional): Deadline inherited from a parent request, as a `time.monotonic()` timestamp. Defaults to None.
+
+        Returns:
+            QueuedRequest: A compact record that can be turned back into a `Request` with `materialize`.
+        """
+        mapping, request = await self._build_async(data, extra_input_args, deadline)
+        return QueuedRequest.from_request(request, mapping)
+
+    async def _build_async(self, data: dict[str, Any], extra_input_args: dict[str, Any], deadline: float | None = None) -> tuple[RequestBuildMapping, Request]:
+        if not (self.preserialize_bodies and self.serialize_in_thread):
+            return self._build(data, extra_input_args, serialize=True, deadline=deadline)
+        mapping, request = self._build(data, extra_input_args, serialize=False, deadline=deadline)
+        await asyncio.to_thread(self._serialize_body, request)
+        return mapping, request
+
+    @staticmethod
+    def _serialize_body(request: Request) -> None:
+        # Compressing here too means nothing is encoded or compressed again when the request is sent
+        if not request.body or request.encoded_body is not None:
+            return
+        request.encoded_body = encode_json(request.body)
+        if request.compression:
+            request.encoded_body = compress(request.encoded_body, request.compression)
+            request.encoded_body_compressed = True
+
+    def build_bulk(
+        self, payloads: Iterable[dict[str, Any]], extra_input_args: dict[str, Any] = dict(), workers: int | None = None, chunk_size: int = 500, start_method: str = "spawn"
+    ) -> BulkBuildResult:
+        """Build many payloads in chunks on a process pool, without stopping at the first invalid payload.
+
+        Workers receive a copy of the registered mappings and transformer arguments, so mappings must be picklable (defined at module level).
+        They return compact request records, which get their id and mapping (looked up by title, so titles must be unique) re-attached here.
+
+        Args:
+            payloads (Iterable[dict[str, Any]]): Raw input payloads
+            extra_input_args (dict[str, Any], optional): Additional input arguments passed to the input schema. Defaults to an empty dictionary.
+            workers (int | None, optional): Number of worker processes. Defaults to the number of CPUs. With 0 or 1 (including on a single CPU host), payloads are built in the current process.
+            chunk_size (int, optional): Payloads sent to a worker at a time. Defaults to 500.
+            start_method (str, optional): The multiprocessing start method. Defaults to "spawn".
+
+        Returns:
+            BulkBuildResult: The built requests and the errors, both keyed by payload position
+        """
+        requests: dict[int, QueuedRequest] = {}
+        errors: list[BuildError] = []
+        for chunk in self.build_bulk_chunks(payloads, extra_input_args, workers, chunk_size, start_method):
+            requests.update(chunk.requests)
+            errors.extend(chunk.errors)
+        self.logger.info("Bulk built %s requests. %s payloads failed.", len(requests), len(errors))
+        return BulkBuildResult(requests=requests, errors=errors)
+
+    def build_bulk_chunks(
+        self, payloads: Iterable[dict[str, Any]], extra_input_args: dict[str, Any] = dict(), workers: int | None = None, chunk_size: int = 500, start_method: str = "spawn"
+    ) -> Iterator[BulkBuildResult]:
+        """Like `build_bulk`, but yield the result of each chunk in input order as soon as it is built, so the first requests can be sent
+        while later chunks are still being built.
+        """
+        if workers is None:
+            workers = os.cpu_count() or 1
+        indexed = enumerate(payloads)
+        chunks = iter(lambda: list(itertools.islice(indexed, chunk_size)), [])
+        mappings = {mapping.title: mapping for mapping in reversed(self.mappings)}
+        next_id = self.id_allocator or _next_request_id
+        if workers <= 1:
+            built: Iterable[BuiltChunk] = (self._build_chunk(chunk, extra_input_args) for chunk in chunks)
+            yield from (self._attach(records, chunk_errors, mappings, next_id) for records, chunk_errors in built)
+            return
+        pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context(start_method),
+            initializer=_init_bulk_worker,
+            initargs=(self.mappings, self.transformer_args, self.preserialize_bodies),
+        )
+        with pool:
+            # `map` yields chunks in order, each one as soon as it and the chunks before it are built
+            for records, chunk_errors in pool.map(_build_chunk, chunks, itertools.repeat(extra_input_args)):
+                yield self._attach(records, chunk_errors, mappings, next_id)
+
+    @staticmethod
+    def _attach(records: list[tuple[int, tuple]], errors: list[BuildError], mappings: dict[str, RequestBuildMapping], next_id: Callable[[], int]) -> BulkBuildResult:
+        requests = {index: QueuedRequest.from_state(state, next_id(), mappings[state[0]]) for index, state in records}
+        return BulkBuildResult(requests=requests, errors=errors)
+
+    def _build_chunk(self, chunk: list[tuple[int, dict[str, Any]]], extra_input_args: dict[str, Any]) -> BuiltChunk:
+        records: list[tuple[int, tuple]] = []
+        errors: list[BuildError] = []
+        for index, data in chunk:
+            try:
+                mapping, request = self._build(data, extra_input_args, serialize=True)
+                records.append((index, QueuedRequest.from_request(request, mapping).to_state()))
+            except ValueError as err:
+                errors.append(BuildError(index=index, error=str(err)))
+        return records, errors
+
+    def _lap(self, stage: str, started: float) -> float:
+        now = time.perf_counter()
+        self.stage_timings[stage] = self.stage_timings.get(stage, 0.0) + now - started  # type: ignore
+        return now
+
+    @staticmethod
+    def _deadline(budget: float | None, inherited: float | None) -> float | None:
+        own = time.monotonic() + budget if budget is not None else None
+        if own is None or inherited is None:
+            return own if inherited is None else inherited
+        return min(own, inherited)
+
+    def match_mapping(self, data: dict[str, Any]) -> RequestBuildMapping | None:
+        """Return the first registered mapping whose matcher accepts the input data.
+
+        Args:
+            data (dict[str, Any]): A dictionary with the raw input data.
+
+        Returns:
+            RequestBuildMapping | None: The matching mapping, or `None` if no mapping applies.
+        """
+        for mapping in self.mappings:
+            if mapping.is_match(data):
+                return mapping
+        return None
+
     def apply_transforms(self, data: dict[str, Any], transformers: list[type[TransformerBase]]) -> dict[str, Any]:
         """Apply each transformer in the order of insertion.
 
@@ -93,3 +379,30 @@ class RequestFactory:
 
     def set_transformer_args(self, mapping_title: str, **transformer_args) -> None:
         self.transformer_args[mapping_title] = transformer_args
+        self._pipelines.clear()
+
+    def known_hosts(self) -> set[URL]:
+        """Collect the origins of all absolute URLs found in the transformer arguments, e.g. base URLs.
+
+        Returns:
+            set[URL]: The URL origins (scheme, host and port)
+        """
+
+        def _collect(value: Any) -> None:
+            if isinstance(value, dict):
+                for v in value.values():
+                    _collect(v)
+            elif isinstance(value, (list, tuple, set)):
+                for v in value:
+                    _collect(v)
+            elif isinstance(value, (str, URL)):
+                try:
+                    url = URL(str(value))
+                except ValueError:
+                    return
+                if url.is_absolute() and url.scheme in ("http", "https"):
+                    hosts.add(url.origin())
+
+        hosts: set[URL] = set()
+        _collect(self.transformer_args)
+        return hosts
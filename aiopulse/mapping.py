@@ -1,8 +1,10 @@
+import functools
 from typing import Any, Callable, Coroutine, List
 
 import aiohttp
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
+from .data_types import Compression
 from .request import Request
 from .response import ProcessedResponse
 from .schema import InputSchemaBase
@@ -12,6 +14,11 @@ ResponseProcessor = Callable[[aiohttp.ClientResponse, Request], Coroutine[Any, A
 Matcher = Callable[[Any], bool]
 
 
+@functools.lru_cache(maxsize=256)
+def _input_json_schema(input_schema: type[InputSchemaBase]) -> dict[str, Any]:
+    return input_schema.model_json_schema()
+
+
 class RequestBuildMapping(BaseModel):
     """Contains all the needed parts for parsing payloads and building a request
 
@@ -22,17 +29,26 @@ class RequestBuildMapping(BaseModel):
         transformers (list[TransformerBase]): A list of `TransformerBase` types, which will sequentially take the previously validated raw input and further transform it into data ready to construct a `Request`
         response_processor (ResponseProcessor): A function that takes a `aiohttp.ClientResponse` and returns a `ProcessedResponse`
         is_match (Matcher): A predicate function used to check against an input payload if it applies to this mapping
+        compression (Compression | None): Compress the body of requests built with this mapping. Defaults to no compression
+        priority (int): Scheduling priority of requests built with this mapping when the queue runs in priority mode. Higher goes first. A `priority` key in the payload overrides it
+        deadline (float | None): Time budget in seconds for requests built with this mapping, inherited by their chained requests. A `deadline` key in the payload overrides it. Defaults to no deadline
     """
 
+    model_config = ConfigDict(defer_build=True)
+
     title: str
     description: str
     input_schema: type[InputSchemaBase]
     transformers: List[type[TransformerBase]] = Field(exclude=True)
     response_processor: ResponseProcessor = Field(exclude=True)
     is_match: Matcher = Field(exclude=True)
+    compression: Compression | None = Field(default=None, exclude=True)
+    priority: int = Field(default=0, exclude=True)
+    deadline: float | None = Field(default=None, gt=0, exclude=True)
 
     def __str__(self) -> str:
         return f"RequestBuildMapping(title='{self.title}' | input_schema='{self.input_schema.__name__}' | transformers={[t.__name__ for t in self.transformers]} | processor='{self.response_processor.__name__}' | matcher='{self.is_match.__name__}'"
 
     def get_input_schema(self) -> dict:
-        return {"title": self.title, "description": self.description, "input_schema": self.input_schema.model_json_schema()}
+        """Describe the mapping and the JSON schema of its input. Schemas are generated once per input schema class and shared, so don't modify them."""
+        return {"title": self.title, "description": self.description, "input_schema": _input_json_schema(self.input_schema)}
@@ -0,0 +1,112 @@
+import asyncio
+import logging
+
+from pydantic import BaseModel, ConfigDict
+
+
+class LoopStats(BaseModel):
+    """Snapshot of the event loop health measured by a `LoopMonitor`.
+
+    Attributes:
+        samples (int): Number of lag samples taken
+        mean_lag (float): Average scheduling lag in seconds
+        max_lag (float): Worst scheduling lag in seconds
+        last_lag (float): Most recent scheduling lag in seconds
+        network_time (float): Accumulated seconds requests spent waiting on the network
+        processor_time (float): Accumulated seconds spent in response processors
+        network_ratio (float): Share of slot time spent on the network as opposed to local processing (0 to 1)
+    """
+
+    model_config = ConfigDict(defer_build=True)
+
+    samples: int = 0
+    mean_lag: float = 0.0
+    max_lag: float = 0.0
+    last_lag: float = 0.0
+    network_time: float = 0.0
+    processor_time: float = 0.0
+    network_ratio: float = 0.0
+
+
+class LoopMonitor:
+    """Measure event loop scheduling lag and where request slots spend their time.
+
+    A background task sleeps for `interval` seconds and records how late it wakes up. A large lag means something is blocking the loop,
+    usually response processors or validation. The client reports network timings (including the body download) and processor timings for every request it sends.
+
+    Args:
+        interval (float, optional): Seconds between lag samples. Defaults to 0.1.
+        lag_threshold (float | None, optional): Log a warning whenever the lag exceeds this many seconds. Defaults to None (never warn).
+    """
+
+    logger = logging.getLogger(__name__)
+
+    def __init__(self, interval: float = 0.1, lag_threshold: float | None = None) -> None:
+        if interval <= 0:
+            raise ValueError("Monitor interval must be positive")
+        self.interval = interval
+        self.lag_threshold = lag_threshold
+        self._task: asyncio.Task | None = None
+        self.reset()
+
+    def reset(self) -> None:
+        self._samples = 0
+        self._total_lag = 0.0
+        self._max_lag = 0.0
+        self._last_lag = 0.0
+        self._network_time = 0.0
+        self._processor_time = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        self.logger.debug("Loop monitor started")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self.logger.debug("Loop monitor stopped")
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.record_lag(max(0.0, loop.time() - expected))
+
+    def record_lag(self, lag: float) -> None:
+        self._samples += 1
+        self._total_lag += lag
+        self._last_lag = lag
+        self._max_lag = max(self._max_lag, lag)
+        if self.lag_threshold is not None and lag > self.lag_threshold:
+            self.logger.warning("Event loop lag of %.3fs exceeds threshold of %.3fs", lag, self.lag_threshold)
+
+    def record_network(self, elapsed: float) -> None:
+        self._network_time += elapsed
+
+    def record_processor(self, elapsed: float) -> None:
+        self._processor_time += elapsed
+
+    def stats(self) -> LoopStats:
+        slot_time = self._network_time + self._processor_time
+        return LoopStats(
+            samples=self._samples,
+            mean_lag=self._total_lag / self._samples if self._samples else 0.0,
+            max_lag=self._max_lag,
+            last_lag=self._last_lag,
+            network_time=self._network_time,
+            processor_time=self._processor_time,
+            network_ratio=self._network_time / slot_time if slot_time else 0.0,
+        )
@@ -0,0 +1,257 @@
+"""Profiling harness for the request build pipeline.
+
+Run `python -m aiopulse.profiling --count 10000` to build synthetic payloads through `RequestFactory.build_request` and print a per-stage timing breakdown.
+Pass `--cprofile <path>` to also dump cProfile statistics for the whole run, `--memory` to report the memory held per queued request,
+and `--import-time` to compare the startup cost of the lazy package import with importing everything eagerly.
+"""
+
+import argparse
+import cProfile
+import gc
+import pstats
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Iterable
+
+from pydantic import BaseModel, Field
+
+from .factory import RequestFactory
+from .mapping import RequestBuildMapping
+from .record import QueuedRequest
+from .response import simple_json_processor
+from .schema import GenericInputSchema
+
+STAGES = ("match", "validate", "dump", "transform", "request", "serialize")
+
+
+class BuildProfile(BaseModel):
+    """Timings collected while building requests.
+
+    Attributes:
+        payloads (int): Number of payloads processed
+        failures (int): Number of payloads that didn't produce a `Request`
+        total (float): Wall-clock time in seconds for the whole run
+        stages (dict[str, float]): Accumulated time in seconds spent in each build stage
+    """
+
+    payloads: int = 0
+    failures: int = 0
+    total: float = 0.0
+    stages: dict[str, float] = Field(default_factory=lambda: dict.fromkeys(STAGES, 0.0))
+
+    def report(self) -> str:
+        built = self.payloads - self.failures
+        lines = [f"Built {built}/{self.payloads} requests in {self.total:.4f}s ({built / self.total if self.total else 0:.0f} req/s)"]
+        staged = sum(self.stages.values()) or 1.0
+        for stage, elapsed in self.stages.items():
+            per_request = elapsed / self.payloads * 1e6 if self.payloads else 0.0
+            lines.append(f"  {stage:<10} {elapsed:10.4f}s {elapsed / staged:7.1%} {per_request:10.2f}us/req")
+        return "\n".join(lines)
+
+
+def _always_match(data: Any) -> bool:
+    return True
+
+
+def synthetic_factory() -> RequestFactory:
+    """Create a factory with a single catch-all mapping based on `GenericInputSchema`."""
+    factory = RequestFactory()
+    factory.register_mapping(
+        RequestBuildMapping(
+            title="Synthetic",
+            description="Catch-all mapping used for profiling",
+            input_schema=GenericInputSchema,
+            transformers=[],
+            response_processor=simple_json_processor,
+            is_match=_always_match,
+        )
+    )
+    return factory
+
+
+def synthetic_payloads(count: int) -> list[dict[str, Any]]:
+    """Generate `count` payloads accepted by `synthetic_factory`."""
+    return [
+        {
+            "description": f"Synthetic request {i}",
+            "url": f"https://www.somehost.com/items/{i % 100}",
+            "method": "POST",
+            "headers": {"x-request-index": str(i)},
+            "body": {"index": i, "tags": ["a", "b", "c"], "nested": {"value": i * 2}},
+            "query_params": {"page": str(i % 10), "size": "50"},
+        }
+        for i in range(count)
+    ]
+
+
+def profile_build(factory: RequestFactory, payloads: Iterable[dict[str, Any]], extra_input_args: dict[str, Any] = dict(), cprofile_path: str | None = None) -> BuildProfile:
+    """Build every payload with `RequestFactory.build_request` and collect the time spent in each stage of the build.
+
+    The stages are timed by the factory itself (see `RequestFactory.stage_timings`): mapping match, input schema validation, `model_dump`,
+    the compiled transformer pipeline, `Request` validation and body pre-serialization.
+
+    Args:
+        factory (RequestFactory): A factory with registered mappings
+        payloads (Iterable[dict[str, Any]]): Raw input payloads
+        extra_input_args (dict[str, Any], optional): Additional input arguments passed to the input schema. Defaults to an empty dictionary.
+        cprofile_path (str | None, optional): If set, dump cProfile statistics of the run to this path. Defaults to None.
+
+    Returns:
+        BuildProfile: The collected timings
+    """
+    profile = BuildProfile()
+    clock = time.perf_counter
+    profiler = cProfile.Profile() if cprofile_path else None
+    previous_timings = factory.stage_timings
+    factory.stage_timings = profile.stages
+    if profiler:
+        profiler.enable()
+    start = clock()
+    try:
+        for data in payloads:
+            profile.payloads += 1
+            try:
+                factory.build_request(data, extra_input_args)
+            except ValueError:
+                profile.failures += 1
+    finally:
+        profile.total = clock() - start
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(cprofile_path)
+        factory.stage_timings = previous_timings
+    return profile
+
+
+class MemoryProfile(BaseModel):
+    """Average memory in bytes held by each queued item.
+
+    Attributes:
+        items (int): Number of items measured
+        request_bytes (float): Bytes per full `Request` model
+        record_bytes (float): Bytes per compact `QueuedRequest` record
+    """
+
+    items: int
+    request_bytes: float
+    record_bytes: float
+
+    def report(self) -> str:
+        saving = 1 - self.record_bytes / self.request_bytes if self.request_bytes else 0.0
+        return f"Memory per queued request over {self.items} items: Request {self.request_bytes:.0f}B | QueuedRequest {self.record_bytes:.0f}B ({saving:.0%} less)"
+
+
+def _held_memory(build: Callable[[], list[Any]]) -> int:
+    gc.collect()
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        held = build()
+        gc.collect()
+        size = tracemalloc.get_traced_memory()[0] - baseline
+    finally:
+        tracemalloc.stop()
+    del held
+    return size
+
+
+def measure_queue_memory(factory: RequestFactory, payloads: list[dict[str, Any]]) -> MemoryProfile:
+    """Measure the memory retained per queued request, as full `Request` models and as compact `QueuedRequest` records.
+
+    Args:
+        factory (RequestFactory): A factory with registered mappings
+        payloads (list[dict[str, Any]]): Raw input payloads. All of them must build successfully
+
+    Returns:
+        MemoryProfile: The average bytes held per item
+    """
+
+    def _records() -> list[QueuedRequest]:
+        records = []
+        for data in payloads:
+            mapping = factory.match_mapping(data)
+            records.append(QueuedRequest.from_request(factory.build_request(data), mapping))  # type: ignore
+        return records
+
+    count = len(payloads) or 1
+    return MemoryProfile(
+        items=len(payloads),
+        request_bytes=_held_memory(lambda: [factory.build_request(data) for data in payloads]) / count,
+        record_bytes=_held_memory(_records) / count,
+    )
+
+
+IMPORT_SCENARIOS = {
+    "lazy": "import aiopulse",
+    "factory": "from aiopulse import RequestFactory",
+    "client": "from aiopulse import Aiopulse",
+    # What `import aiopulse` used to cost: every submodule imported and every model schema built
+    "eager": "import aiopulse\nfrom pydantic import BaseModel\nfor name in aiopulse.__all__:\n    obj = getattr(aiopulse, name)\n    if isinstance(obj, type) and issubclass(obj, BaseModel):\n        obj.model_rebuild(force=True)",
+}
+
+
+class ImportProfile(BaseModel):
+    """Startup cost of importing the package, measured in fresh interpreters.
+
+    Attributes:
+        runs (int): Number of interpreters started per scenario
+        timings (dict[str, float]): Median seconds spent importing, per scenario in `IMPORT_SCENARIOS`
+    """
+
+    runs: int
+    timings: dict[str, float]
+
+    def report(self) -> str:
+        eager = self.timings.get("eager")
+        lines = [f"Import time (median of {self.runs} runs)"]
+        for scenario, elapsed in self.timings.items():
+            saving = f" ({1 - elapsed / eager:.0%} less than eager)" if eager and scenario != "eager" else ""
+            lines.append(f"  {scenario:<10} {elapsed * 1e3:10.1f}ms{saving}")
+        return "\n".join(lines)
+
+
+def _time_import(statement: str) -> float:
+    script = f"import time\n_start = time.perf_counter()\n{statement}\nprint(time.perf_counter() - _start)"
+    output = subprocess.run([sys.executable, "-c", script], check=True, capture_output=True, text=True).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def measure_import_time(runs: int = 5, scenarios: Iterable[str] = IMPORT_SCENARIOS) -> ImportProfile:
+    """Time importing the package in fresh interpreters, so module caches from the current process don't interfere.
+
+    Args:
+        runs (int, optional): Number of interpreters started per scenario. Defaults to 5.
+        scenarios (Iterable[str], optional): Names of the `IMPORT_SCENARIOS` to run. Defaults to all of them.
+
+    Returns:
+        ImportProfile: The median import time of each scenario
+    """
+    return ImportProfile(runs=runs, timings={scenario: statistics.median(_time_import(IMPORT_SCENARIOS[scenario]) for _ in range(runs)) for scenario in scenarios})
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Profile the aiopulse request build pipeline")
+    parser.add_argument("-n", "--count", type=int, default=10_000, help="Number of synthetic payloads to build")
+    parser.add_argument("--cprofile", metavar="PATH", help="Dump cProfile statistics to PATH")
+    parser.add_argument("--top", type=int, default=0, help="Print the N most expensive functions (requires --cprofile)")
+    parser.add_argument("--memory", action="store_true", help="Also report memory held per queued request")
+    parser.add_argument("--import-time", action="store_true", help="Also compare lazy and eager package import times")
+    args = parser.parse_args(argv)
+
+    factory = synthetic_factory()
+    payloads = synthetic_payloads(args.count)
+    profile = profile_build(factory, payloads, cprofile_path=args.cprofile)
+    print(profile.report())
+    if args.cprofile and args.top:
+        pstats.Stats(args.cprofile).sort_stats("cumulative").print_stats(args.top)
+    if args.memory:
+        print(measure_queue_memory(factory, payloads).report())
+    if args.import_time:
+        print(measure_import_time().report())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+import logging
+import time
+from typing import Any, Callable
+
+from pydantic import BaseModel, ConfigDict, Field
+
+UNMAPPED = "unmapped"
+
+
+class MappingProgress(BaseModel):
+    """Completed requests of a single mapping.
+
+    Attributes:
+        succeeded (int): Requests whose processed response was ok
+        failed (int): Requests that failed, including cancelled and timed out ones
+    """
+
+    model_config = ConfigDict(defer_build=True)
+
+    succeeded: int = 0
+    failed: int = 0
+
+
+class ProgressSnapshot(BaseModel):
+    """Progress of a job at a point in time, as reported by a `ProgressTracker`.
+
+    Attributes:
+        queued (int): Requests waiting in the queue
+        in_flight (int): Requests taken from the queue and not completed yet
+        deferred (int): Payloads waiting for the request they depend on, including nested chains
+        succeeded (int): Completed requests whose processed response was ok
+        failed (int): Completed requests that failed
+        skipped (int): Deferred payloads dropped because a request they depend on failed or couldn't be built
+        total (int): All requests known so far. It grows as response processors add chained requests
+        elapsed (float): Seconds since the tracker started
+        throughput (float): Exponential moving average of completed requests per second
+        eta (float | None): Estimated seconds until the known requests are completed. `None` until a throughput is measured
+        mappings (dict[str, MappingProgress]): Completed requests per mapping title
+    """
+
+    model_config = ConfigDict(defer_build=True)
+
+    queued: int
+    in_flight: int
+    deferred: int
+    succeeded: int
+    failed: int
+    skipped: int
+    total: int
+    elapsed: float
+    throughput: float
+    eta: float | None
+    mappings: dict[str, MappingProgress] = Field(default_factory=dict)
+
+    @property
+    def remaining(self) -> int:
+        return self.queued + self.in_flight + self.deferred
+
+    @property
+    def completed(self) -> int:
+        return self.succeeded + self.failed
+
+
+ProgressCallback = Callable[[ProgressSnapshot], Any]
+
+
+class ProgressTracker:
+    """Keep job progress up to date as requests are enqueued, deferred and completed, so reading it never scans the queue.
+
+    Throughput is sampled at most every `sample_interval` seconds, when requests complete or a snapshot is taken, and smoothed with an exponential moving average. The ETA divides the remaining requests by it.
+
+    Args:
+        alpha (float, optional): Weight of the latest throughput sample in the moving average, between 0 and 1. Defaults to 0.3.
+        sample_interval (float, optional): Minimum seconds between throughput samples. Defaults to 1.0.
+        on_progress (ProgressCallback | None, optional): Called with a snapshot at most every `report_interval` seconds while requests complete, and when `report` is called. Defaults to None.
+        report_interval (float, optional): Minimum seconds between calls to `on_progress`. Defaults to 5.0.
+    """
+
+    logger = logging.getLogger(__name__)
+
+    def __init__(self, alpha: float = 0.3, sample_interval: float = 1.0, on_progress: ProgressCallback | None = None, report_interval: float = 5.0) -> None:
+        if not 0 < alpha <= 1:
+            raise ValueError("Alpha must be between 0 and 1")
+        if sample_interval <= 0 or report_interval <= 0:
+            raise ValueError("Intervals must be positive")
+        self.alpha = alpha
+        self.sample_interval = sample_interval
+        self.on_progress = on_progress
+        self.report_interval = report_interval
+        self.reset()
+
+    def reset(self) -> None:
+        self.queued = 0
+        self.in_flight = 0
+        self.deferred = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.skipped = 0
+        self.mappings: dict[str, MappingProgress] = dict()
+        self._started: float | None = None
+        self._throughput: float | None = None
+        self._last_sample = 0.0
+        self._sampled_completed = 0
+        self._last_report = 0.0
+
+    def start(self) -> None:
+        """Start the clock used for elapsed time and throughput, unless it is already running."""
+        if self._started is None:
+            self._started = self._last_sample = self._last_report = time.monotonic()
+
+    def enqueued(self, from_deferred: bool = False) -> None:
+        """A request was added to the queue. `from_deferred` means it was built from a payload already counted as deferred."""
+        self.queued += 1
+        if from_deferred:
+            self.deferred -= 1
+
+    def deferred_added(self, count: int) -> None:
+        """`count` payloads, including nested chains, were deferred."""
+        self.deferred += count
+
+    def dequeued(self) -> None:
+        self.queued -= 1
+        self.in_flight += 1
+
+    def skip(self, count: int) -> None:
+        """`count` deferred payloads will never be sent."""
+        self.deferred -= count
+        self.skipped += count
+
+    def completed(self, mapping_title: str | None, ok: bool) -> None:
+        """A request sent (or given up on) by the client completed."""
+        self.in_flight -= 1
+        mapping = self.mappings.get(mapping_title or UNMAPPED)
+        if mapping is None:
+            mapping = self.mappings[mapping_title or UNMAPPED] = MappingProgress()
+        if ok:
+            self.succeeded += 1
+            mapping.succeeded += 1
+        else:
+            self.failed += 1
+            mapping.failed += 1
+        self.start()
+        now = time.monotonic()
+        if now - self._last_sample >= self.sample_interval:
+            self._sample(now)
+        if self.on_progress and now - self._last_report >= self.report_interval:
+            self.report()
+
+    def _sample(self, now: float) -> None:
+        done = self.succeeded + self.failed
+        rate = (done - self._sampled_completed) / (now - self._last_sample)
+        self._throughput = rate if self._throughput is None else self.alpha * rate + (1 - self.alpha) * self._throughput
+        self._sampled_completed = done
+        self._last_sample = now
+
+    @property
+    def throughput(self) -> float:
+        """Smoothed completed requests per second. Before the first sample, the average since the tracker started."""
+        if self._throughput is not None:
+            return self._throughput
+        if self._started is None:
+            return 0.0
+        elapsed = time.monotonic() - self._started
+        return (self.succeeded + self.failed) / elapsed if elapsed else 0.0
+
+    def snapshot(self) -> ProgressSnapshot:
+        now = time.monotonic()
+        if self._started is not None and now - self._last_sample >= self.sample_interval:
+            self._sample(now)
+        throughput = self.throughput
+        remaining = self.queued + self.in_flight + self.deferred
+        return ProgressSnapshot(
+            queued=self.queued,
+            in_flight=self.in_flight,
+            deferred=self.deferred,
+            succeeded=self.succeeded,
+            failed=self.failed,
+            skipped=self.skipped,
+            total=remaining + self.succeeded + self.failed + self.skipped,
+            elapsed=now - self._started if self._started is not None else 0.0,
+            throughput=throughput,
+            eta=remaining / throughput if throughput else None,
+            mappings={title: mapping.model_copy() for title, mapping in self.mappings.items()},
+        )
+
+    def report(self) -> ProgressSnapshot:
+        """Take a snapshot and pass it to `on_progress`, if set."""
+        snapshot = self.snapshot()
+        self._last_report = time.monotonic()
+        if self.on_progress:
+            self.on_progress(snapshot)
+        return snapshot
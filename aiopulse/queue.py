@@ -1,25 +1,133 @@
 import asyncio
+import heapq
+import itertools
 import logging
-from typing import Any
+from typing import Any, Literal
 
-from .factory import RequestFactory
+from .factory import BuildError, RequestFactory
+from .progress import ProgressTracker
+from .record import QueuedRequest
 from .request import Request
 
+Fairness = Literal["mapping", "tenant"]
+QueueItem = Request | QueuedRequest
+
+
+def count_payloads(payloads: list[dict[str, Any]]) -> int:
+    """Count payloads including their nested chains."""
+    count = 0
+    for payload in payloads:
+        count += 1
+        chain: list[dict[str, Any]] | None = payload.get("chain")
+        if chain:
+            count += count_payloads(chain)
+    return count
+
+
+class PriorityScheduler:
+    """Non-blocking replacement for `asyncio.Queue` that orders requests by priority, then by weighted fair share between flows.
+
+    A flow is either the mapping a request was built from or its tenant. Within the same priority, each flow gets a share of the
+    dispatch slots proportional to its weight (weighted fair queuing), so a large fan-out from one flow can't starve the others.
+
+    Args:
+        fairness (Fairness | None, optional): What requests are grouped by for fair sharing. `None` disables fair sharing (FIFO within a priority). Defaults to "mapping".
+        chain_first (bool, optional): Dispatch chained requests ahead of top-level requests of the same priority. Defaults to False.
+    """
+
+    def __init__(self, fairness: Fairness | None = "mapping", chain_first: bool = False) -> None:
+        self.fairness = fairness
+        self.chain_first = chain_first
+        self.weights: dict[str, float] = dict()
+        self._heap: list[tuple[tuple[int, int, float, int], float, QueueItem]] = []
+        self._sequence = itertools.count()
+        self._finish_tags: dict[str, float] = dict()
+        self._virtual_time = 0.0
+
+    def _flow(self, item: QueueItem) -> str:
+        if self.fairness == "tenant":
+            return item.tenant or ""
+        if self.fairness == "mapping":
+            return item.mapping_title or ""
+        return ""
+
+    def put_nowait(self, item: QueueItem, chained: bool = False) -> None:
+        if self.fairness:
+            flow = self._flow(item)
+            start = max(self._virtual_time, self._finish_tags.get(flow, 0.0))
+            finish = start + 1 / self.weights.get(flow, 1.0)
+            self._finish_tags[flow] = finish
+        else:
+            start = finish = 0.0
+        key = (-item.priority, 0 if chained and self.chain_first else 1, finish, next(self._sequence))
+        heapq.heappush(self._heap, (key, start, item))
+
+    def get_nowait(self) -> QueueItem:
+        if not self._heap:
+            raise asyncio.QueueEmpty
+        _, start, item = heapq.heappop(self._heap)
+        self._virtual_time = max(self._virtual_time, start)
+        return item
+
+    def qsize(self) -> int:
+        return len(self._heap)
+
 
 class RequestQueue:
-    def __init__(self) -> None:
+    """Queue of requests waiting to be sent, plus payloads deferred until the request they depend on completes.
+
+    By default requests are sent in FIFO order. In priority mode, requests with a higher `priority` (set on the mapping or in the payload) go first,
+    and flows (mappings or tenants) share dispatch slots according to their weights, see `PriorityScheduler`.
+
+    Args:
+        compact (bool, optional): Store built requests as compact `QueuedRequest` records and only materialize the full `Request` when it is retrieved. Defaults to False.
+        priority (bool, optional): Enable priority and fair scheduling. Defaults to False.
+        fairness (Fairness | None, optional): In priority mode, what requests are grouped by for fair sharing. Defaults to "mapping".
+        chain_first (bool, optional): Dispatch chained requests ahead of new top-level requests, so chains holding memory drain sooner. Implies priority mode. Defaults to False.
+        progress (ProgressTracker | None, optional): Tracker notified as requests are enqueued, dequeued, deferred and skipped. Defaults to None.
+    """
+
+    def __init__(self, compact: bool = False, priority: bool = False, fairness: Fairness | None = "mapping", chain_first: bool = False, progress: ProgressTracker | None = None) -> None:
         self.logger = logging.getLogger(__name__)
-        self._queue: asyncio.Queue[Request] = asyncio.Queue()
+        self.compact = compact
+        self.progress = progress
+        self._queue: asyncio.Queue[QueueItem] | PriorityScheduler
+        if priority or chain_first:
+            self._queue = PriorityScheduler(fairness=fairness, chain_first=chain_first)
+        else:
+            self._queue = asyncio.Queue()
         self._deferred_requests: dict[int, list[dict[str, Any]]] = dict()
+        self._deferred_deadlines: dict[int, float] = dict()
         self.logger.debug("RequestQueue initialized.")
 
-    async def add(self, request: Request) -> None:
-        await self._queue.put(request)
+    def set_weight(self, flow: str, weight: float) -> None:
+        """Set the fair share weight of a mapping title or tenant. Flows default to a weight of 1.
+
+        Raises:
+            ValueError: If the queue is not in priority mode or the weight is not positive.
+        """
+        if not isinstance(self._queue, PriorityScheduler):
+            raise ValueError("Weights can only be set on a queue in priority mode")
+        if weight <= 0:
+            raise ValueError("Weight must be positive")
+        self._queue.weights[flow] = weight
+
+    async def add(self, request: QueueItem, chained: bool = False) -> None:
+        if isinstance(self._queue, PriorityScheduler):
+            self._queue.put_nowait(request, chained=chained)
+        else:
+            await self._queue.put(request)
+        if self.progress:
+            self.progress.enqueued(from_deferred=chained)
         self.logger.info(f"Added request with id {request.id} to queue")
 
     def get(self) -> Request:
         req = self._queue.get_nowait()
+        if self.progress:
+            self.progress.dequeued()
         self.logger.info(f"Retrieved request with id {req.id} from queue")
+        if isinstance(req, QueuedRequest):
+            return req.materialize()
         return req
 
     def get_deferred(self, parent_id: int) -> list[dict[str, Any]]:
@@ -27,44 +135,94 @@ class RequestQueue:
         self.logger.info(f"Retrieved {len(deferred)} from queue")
         return deferred
 
-    def defer(self, chain: list[dict[str, Any]], dependency: int) -> None:
+    def defer(self, chain: list[dict[str, Any]], dependency: int, deadline: float | None = None, counted: bool = False) -> None:
+        """Hold payloads until the request they depend on completes. `counted` means the payloads were already counted as deferred by the progress tracker."""
         self.logger.info("Request id %s has %s dependent requests. Adding to deferred queue...", dependency, len(chain))
+        if self.progress and not counted:
+            self.progress.deferred_added(count_payloads(chain))
+        if deadline is not None:
+            self._deferred_deadlines[dependency] = deadline
         dependencies = self._deferred_requests.get(dependency)
         if dependencies:
             self._deferred_requests[dependency].extend(chain)
         else:
             self._deferred_requests[dependency] = chain
 
-    async def build_and_add(self, factory: RequestFactory, data: dict[str, Any], chain_keyword: str = "chain", extra_args: dict[str, Any] = dict()) -> None:
-        request = factory.build_request(data, extra_input_args=extra_args)
-        await self.add(request)
+    async def build_and_add(
+        self, factory: RequestFactory, data: dict[str, Any], chain_keyword: str = "chain", extra_args: dict[str, Any] = dict(), chained: bool = False, deadline: float | None = None
+    ) -> None:
+        if self.compact:
+            request = await factory.build_record_async(data, extra_input_args=extra_args, deadline=deadline)
+        else:
+            request = await factory.build_request_async(data, extra_input_args=extra_args, deadline=deadline)
+        await self.add(request, chained=chained)
         chain = data.get(chain_keyword)
         if chain:
-            self.defer(chain, request.id)
+            # The nested chains of chained payloads were counted along with their parent
+            self.defer(chain, request.id, request.deadline, counted=chained)
+
+    async def add_bulk(
+        self, factory: RequestFactory, payloads: list[dict[str, Any]], chain_keyword: str = "chain", extra_args: dict[str, Any] = dict(), workers: int | None = None, chunk_size: int = 500
+    ) -> list[BuildError]:
+        """Build a large batch of payloads on a process pool with `RequestFactory.build_bulk_chunks` and enqueue them in input order.
+
+        Each chunk is enqueued as soon as it is built, so requests can be sent while later chunks are still being built. The build runs in a thread,
+        so the event loop stays responsive while workers are busy.
+
+        Returns:
+            list[BuildError]: Payloads that failed to build
+        """
+        chunks = factory.build_bulk_chunks(payloads, extra_args, workers, chunk_size)
+        errors: list[BuildError] = []
+        try:
+            while (result := await asyncio.to_thread(next, chunks, None)) is not None:
+                for index, record in result.requests.items():
+                    await self.add(record if self.compact else record.materialize())
+                    chain = payloads[index].get(chain_keyword)
+                    if chain:
+                        self.defer(chain, record.id, record.deadline)
+                for error in result.errors:
+                    self.logger.error("Failed to build payload %s: %s", error.index, error.error)
+                errors.extend(result.errors)
+        finally:
+            # Shuts the process pool down, which waits for its workers
+            await asyncio.to_thread(chunks.close)
+        return errors
 
     async def add_deferred(self, factory: RequestFactory, dependency: int, extra_input_args: dict[str, Any] = dict()) -> None:
         self.logger.info("Fetching deferred requests for dependency %s...", dependency)
-        deferred = self.get_deferred(dependency)
+        # Built payloads are queued, so they no longer count as deferred
+        deferred = self._deferred_requests.pop(dependency, [])
+        deadline = self._deferred_deadlines.pop(dependency, None)
         if deferred:
             self.logger.info("Found %s dependent requests. %s extra args will be passed to chained data.", len(deferred), len(extra_input_args))
-            for payload in deferred:
-                await self.build_and_add(factory, payload, extra_args=extra_input_args)
+            for i, payload in enumerate(deferred):
+                try:
+                    await self.build_and_add(factory, payload, extra_args=extra_input_args, chained=True, deadline=deadline)
+                except ValueError:
+                    if self.progress:
+                        self.progress.skip(count_payloads(deferred[i:]))
+                    raise
+
+    def skip_deferred(self, dependency: int) -> int:
+        """Drop the payloads waiting for a request that failed, since they will never be sent.
+
+        Returns:
+            int: Number of payloads dropped, including nested chains
+        """
+        deferred = self._deferred_requests.pop(dependency, [])
+        self._deferred_deadlines.pop(dependency, None)
+        count = count_payloads(deferred)
+        if self.progress and count:
+            self.progress.skip(count)
+        return count
 
     def request_count(self) -> int:
         return self._queue.qsize()
 
     def deferred_count(self) -> int:
-        def _count_recursively(deferred_list: list[dict[str, Any]]) -> int:
-            count = 0
-            for payload in deferred_list:
-                count += 1
-                chain: list[dict[str, Any]] | None = payload.get("chain")
-                if chain:
-                    count += _count_recursively(chain)
-
-            return count
-
-        return _count_recursively([deferred for deferred_list in self._deferred_requests.values() for deferred in deferred_list])
+        """Count deferred payloads by walking all of them. Use a `ProgressTracker` to poll progress during large jobs."""
+        return count_payloads([deferred for deferred_list in self._deferred_requests.values() for deferred in deferred_list])
 
     def total_request_count(self) -> int:
         return self.request_count() + self.deferred_count()
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import sys
+from typing import TYPE_CHECKING, Any
+
+from yarl import URL
+
+from .data_types import Method
+from .request import Request
+
+if TYPE_CHECKING:
+    from .mapping import RequestBuildMapping
+
+_CORE_FIELDS = {"id", "description", "url", "method", "response_processor", "mapping_title"}
+_DEFAULTS = {name: field.get_default(call_default_factory=True) for name, field in Request.model_fields.items() if name not in _CORE_FIELDS}
+
+
+class QueuedRequest:
+    """Compact representation of a validated request waiting to be dispatched.
+
+    Only fields that differ from their defaults are kept, the URL is stored as a plain string, the method and host are interned,
+    and the response processor is reached through a shared reference to the mapping. Call `materialize` to get the full `Request` back.
+    """
+
+    __slots__ = ("id", "mapping", "method", "host", "url", "description", "fields")
+
+    def __init__(self, id: int, mapping: RequestBuildMapping, method: str, url: str, description: str, fields: dict[str, Any] | None = None) -> None:
+        self.id = id
+        self.mapping = mapping
+        self.method = sys.intern(method)
+        self.url = url
+        self.host = sys.intern(URL(url, encoded=True).host or "")
+        self.description = description
+        self.fields = fields
+
+    @classmethod
+    def from_request(cls, request: Request, mapping: RequestBuildMapping) -> QueuedRequest:
+        fields = {name: value for name, default in _DEFAULTS.items() if (value := getattr(request, name)) is not default and value != default}
+        return cls(request.id, mapping, request.method.value, str(request.url), request.description, fields or None)
+
+    def to_state(self) -> tuple[str, str, str, str, dict[str, Any] | None]:
+        """Picklable state without the id and mapping, which are re-attached with `from_state`. The mapping is identified by its title."""
+        return (self.mapping.title, self.method, self.url, self.description, self.fields)
+
+    @classmethod
+    def from_state(cls, state: tuple[str, str, str, str, dict[str, Any] | None], id: int, mapping: RequestBuildMapping) -> QueuedRequest:
+        _, method, url, description, fields = state
+        return cls(id, mapping, method, url, description, fields)
+
+    def materialize(self) -> Request:
+        """Rebuild the full `Request`. The data was validated when the record was created, so validation is skipped."""
+        return Request.model_construct(
+            id=self.id,
+            description=self.description,
+            url=URL(self.url, encoded=True),
+            method=Method(self.method),
+            response_processor=self.mapping.response_processor,
+            mapping_title=self.mapping.title,
+            **(self.fields or {}),
+        )
+
+    @property
+    def priority(self) -> int:
+        return self.fields.get("priority", 0) if self.fields else 0
+
+    @property
+    def tenant(self) -> str | None:
+        return self.fields.get("tenant") if self.fields else None
+
+    @property
+    def deadline(self) -> float | None:
+        return self.fields.get("deadline") if self.fields else None
+
+    @property
+    def mapping_title(self) -> str:
+        return self.mapping.title
+
+    def __repr__(self) -> str:
+        return f"QueuedRequest(id={self.id}, method='{self.method}', url='{self.url}', mapping='{self.mapping.title}')"
@@ -1,16 +1,25 @@
 from __future__ import annotations
 
-from typing import Any, Callable, Coroutine
+import json
+import time
+from pathlib import Path
+from typing import Any, AsyncIterable, Callable, Coroutine
 
 import aiohttp
 from pydantic import BaseModel, ConfigDict, Field, field_validator, model_validator
 
-from .data_types import Counter, Method, SerializableURL
+from .data_types import Compression, Counter, Method, SerializableURL, with_query_params
+from .encoding import compress, compress_stream, file_chunks, zstd_available
 from .response import ProcessedResponse
 
 
+def encode_json(body: dict[str, Any]) -> bytes:
+    """Serialize a request body to compact UTF-8 encoded JSON."""
+    return json.dumps(body, separators=(",", ":")).encode()
+
+
 class Request(BaseModel):
-    model_config = ConfigDict(arbitrary_types_allowed=True)
+    model_config = ConfigDict(arbitrary_types_allowed=True, defer_build=True)
 
     id: int = Field(default_factory=Counter())
     description: str
@@ -19,7 +28,16 @@ class Request(BaseModel):
     body: dict[str, Any] = Field(default_factory=dict)
     headers: dict[str, str] = Field(default_factory=dict)
     form_data: dict[str, Any] = Field(default_factory=dict)
+    encoded_body: bytes | memoryview | None = Field(default=None, exclude=True, repr=False)
+    encoded_body_compressed: bool = Field(default=False, exclude=True, repr=False)
+    body_stream: Path | AsyncIterable[bytes] | None = Field(default=None, exclude=True, repr=False)
+    content_type: str = Field(default="application/json", exclude=True)
+    compression: Compression | None = Field(default=None, exclude=True)
     query_params: dict[str, str] = Field(default_factory=dict, exclude=True)
+    priority: int = Field(default=0, exclude=True)
+    tenant: str | None = Field(default=None, exclude=True)
+    mapping_title: str | None = Field(default=None, exclude=True)
+    deadline: float | None = Field(default=None, exclude=True)
     response_processor: Callable[[aiohttp.ClientResponse, Request], Coroutine[Any, Any, ProcessedResponse]] = Field(exclude=True)
 
     @model_validator(mode="before")
@@ -51,19 +69,39 @@ class Request(BaseModel):
 
     @model_validator(mode="after")
     def either_payload_or_formdata(self) -> Request:
-        if self.body and self.form_data:
+        if (self.body or self.encoded_body is not None) and self.form_data:
             raise ValueError("Request cannot have both a body and form data")
+        if self.body_stream is not None and (self.body or self.encoded_body is not None or self.form_data):
+            raise ValueError("Request cannot have both a body stream and a body or form data")
+        return self
+
+    @model_validator(mode="after")
+    def validate_compression(self) -> Request:
+        if self.compression and self.form_data:
+            raise ValueError("Form data cannot be compressed")
+        if self.compression == Compression.ZSTD and not zstd_available():
+            raise ValueError("zstd compression requires Python >= 3.14 or the 'zstandard' package")
         return self
 
     @model_validator(mode="after")
     def add_query_params(self) -> Request:
-        self.url = self.url.update_query(self.query_params)  # type: ignore
+        self.url = with_query_params(self.url, self.query_params)  # type: ignore
         return self
 
+    def remaining_time(self) -> float | None:
+        """Seconds left before the request's deadline (negative once it has passed), or `None` if it has no deadline."""
+        if self.deadline is None:
+            return None
+        return self.deadline - time.monotonic()
+
     def prepare(self) -> dict[str, Any]:
         """
         Prepares the request parameters for aiohttp's request method.
 
+        A pre-encoded body takes precedence over `body` and is passed through as-is, without being serialized or copied again.
+        Body streams (files or async iterables of bytes) are sent with chunked transfer encoding. Note that async iterables can only be sent once.
+        If `compression` is set, the body is compressed (incrementally for streams) and the `Content-Encoding` header is added.
+
         Returns:
             dict[str, Any]: The prepared request parameters.
         """
@@ -72,10 +110,28 @@ class Request(BaseModel):
             "url": self.url,
             "headers": self.headers,
         }
-        if self.body:
+        data: bytes | memoryview | AsyncIterable[bytes] | None = None
+        if self.body_stream is not None:
+            data = file_chunks(self.body_stream) if isinstance(self.body_stream, Path) else self.body_stream
+        elif self.encoded_body is not None:
+            data = self.encoded_body
+        elif self.body and self.compression:
+            data = encode_json(self.body)
+        elif self.body:
             params["json"] = self.body
         elif self.form_data:
             params["data"] = self.form_data
+
+        if data is not None:
+            headers = dict(self.headers)
+            if not any(header.lower() == "content-type" for header in headers):
+                headers["Content-Type"] = self.content_type
+            if self.compression:
+                if not (self.encoded_body_compressed and data is self.encoded_body):
+                    data = compress(data, self.compression) if isinstance(data, (bytes, memoryview)) else compress_stream(data, self.compression)
+                headers["Content-Encoding"] = self.compression.value
+            params["data"] = data
+            params["headers"] = headers
         return params
 
     async def process_response(self, response: aiohttp.ClientResponse) -> ProcessedResponse:
@@ -1,10 +1,12 @@
 from typing import Any
 
 import aiohttp
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class ProcessedResponse(BaseModel):
+    model_config = ConfigDict(defer_build=True)
+
     ok: bool
     status: int | None = Field(ge=100, lt=600, default=None)
     content: list[dict[str, Any]] = Field(default_factory=list)
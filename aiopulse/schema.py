@@ -15,6 +15,7 @@ class InputSchemaBase(BaseModel):
 
     class Config:
         arbitrary_types_allowed = True
+        defer_build = True
 
         @staticmethod
         def json_schema_extra(schema: dict[str, Any], model: type["InputSchemaBase"]) -> None:
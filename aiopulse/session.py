@@ -0,0 +1,118 @@
+import asyncio
+import logging
+from typing import Iterable
+
+import aiohttp
+from pydantic import BaseModel, ConfigDict, Field
+from yarl import URL
+
+
+class SessionConfig(BaseModel):
+    """Connection pool settings for the session managed by `SessionManager`.
+
+    Attributes:
+        limit (int): Maximum number of simultaneous connections. 0 means no limit
+        limit_per_host (int): Maximum number of simultaneous connections to the same endpoint. 0 means no limit
+        use_dns_cache (bool): Cache DNS lookups
+        ttl_dns_cache (int | None): Seconds DNS entries are cached for. `None` caches them forever
+        keepalive_timeout (float): Seconds an idle connection is kept open for reuse. Ignored if `force_close` is set
+        force_close (bool): Close connections after each request instead of keeping them alive
+        enable_cleanup_closed (bool): Abort SSL connections that were not shut down properly by the server
+        timeout (float | None): Default total timeout in seconds for the session. Per-request timeouts still take precedence
+        prewarm (bool): Open connections to known hosts as soon as the session is created
+        prewarm_hosts (list[str]): Hosts to pre-warm in addition to those found in transformer arguments
+        prewarm_timeout (float): Timeout in seconds for each pre-warming request
+    """
+
+    model_config = ConfigDict(defer_build=True)
+
+    limit: int = Field(default=100, ge=0)
+    limit_per_host: int = Field(default=0, ge=0)
+    use_dns_cache: bool = True
+    ttl_dns_cache: int | None = 300
+    keepalive_timeout: float = Field(default=15.0, gt=0)
+    force_close: bool = False
+    enable_cleanup_closed: bool = False
+    timeout: float | None = None
+    prewarm: bool = False
+    prewarm_hosts: list[str] = Field(default_factory=list)
+    prewarm_timeout: float = Field(default=5.0, gt=0)
+
+
+class SessionManager:
+    """Own a pooled `aiohttp.ClientSession` built from a `SessionConfig` and reuse it across `process_queue` calls.
+
+    The session is created lazily on first use and recreated if it has been closed.
+    """
+
+    logger = logging.getLogger(__name__)
+
+    def __init__(self, config: SessionConfig | None = None) -> None:
+        self.config = config or SessionConfig()
+        self._session: aiohttp.ClientSession | None = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession | None:
+        """The current session, if one is open."""
+        if self._session is None or self._session.closed:
+            return None
+        return self._session
+
+    def _build_connector(self) -> aiohttp.TCPConnector:
+        config = self.config
+        kwargs = {}
+        # aiohttp refuses a keepalive timeout on connectors that force close
+        if not config.force_close:
+            kwargs["keepalive_timeout"] = config.keepalive_timeout
+        return aiohttp.TCPConnector(
+            limit=config.limit,
+            limit_per_host=config.limit_per_host,
+            use_dns_cache=config.use_dns_cache,
+            ttl_dns_cache=config.ttl_dns_cache,
+            force_close=config.force_close,
+            enable_cleanup_closed=config.enable_cleanup_closed,
+            **kwargs,
+        )
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        """Return the managed session, creating it if needed."""
+        if self.session is None:
+            timeout = aiohttp.ClientTimeout(total=self.config.timeout)
+            self._session = aiohttp.ClientSession(connector=self._build_connector(), timeout=timeout)
+            self.logger.info("Created managed ClientSession (limit=%s, limit_per_host=%s)", self.config.limit, self.config.limit_per_host)
+        return self._session  # type: ignore
+
+    async def prewarm(self, urls: Iterable[URL | str]) -> int:
+        """Open a pooled connection to the origin of each URL by sending a `HEAD` request.
+
+        Failures are logged and ignored, since pre-warming is only an optimization.
+
+        Args:
+            urls (Iterable[URL | str]): URLs whose hosts should be connected to
+
+        Returns:
+            int: Number of hosts successfully connected to
+        """
+        origins = {URL(str(url)).origin() for url in urls if URL(str(url)).is_absolute()}
+        if not origins:
+            return 0
+        session = await self.get_session()
+        timeout = aiohttp.ClientTimeout(total=self.config.prewarm_timeout)
+
+        async def _connect(origin: URL) -> bool:
+            try:
+                async with session.head(origin, timeout=timeout, allow_redirects=False):
+                    return True
+            except (aiohttp.ClientError, asyncio.TimeoutError) as err:
+                self.logger.warning("Failed to pre-warm connection to %s. Error: %s", origin, err)
+                return False
+
+        warmed = sum(await asyncio.gather(*[_connect(origin) for origin in origins]))
+        self.logger.info("Pre-warmed connections to %s/%s hosts", warmed, len(origins))
+        return warmed
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+            self.logger.info("Closed managed ClientSession")
+        self._session = None
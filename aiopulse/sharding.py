@@ -0,0 +1,261 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+from typing import Any, AsyncIterator, Callable, Coroutine, Iterable
+
+from .client import Aiopulse, ProcessingResult
+from .data_types import MAX_SHARD, IdAllocator, split_id
+from .mapping import RequestBuildMapping
+from .session import SessionConfig
+
+_END_OF_INPUT = None
+
+
+class _ShardError:
+    def __init__(self, shard: int, error: str) -> None:
+        self.shard = shard
+        self.error = error
+
+
+class _ShardDone:
+    def __init__(self, shard: int, error: str | None = None) -> None:
+        self.shard = shard
+        self.error = error
+
+
+def _read_inbox(inbox: multiprocessing.Queue, loop: asyncio.AbstractEventLoop, add: Callable[[dict[str, Any]], Coroutine[Any, Any, None]], done: Callable[[], None]) -> None:
+    # Runs in a daemon thread, so a worker blocked on its inbox can still exit. Waiting for each payload to be added applies backpressure.
+    try:
+        while (payload := inbox.get()) is not _END_OF_INPUT:
+            asyncio.run_coroutine_threadsafe(add(payload), loop).result()
+    finally:
+        loop.call_soon_threadsafe(done)
+
+
+async def _run_shard(
+    shard: int,
+    mappings: list[RequestBuildMapping],
+    transformer_args: dict[str, Any],
+    session_config: SessionConfig,
+    inbox: multiprocessing.Queue,
+    outbox: multiprocessing.Queue,
+    batch_size: int,
+    timeout: int,
+    chain_keyword: str,
+    extra_args: dict[str, Any],
+    id_shard: int,
+    last_id: int,
+    prefetch: int,
+) -> None:
+    client = Aiopulse(session_config=session_config, id_allocator=IdAllocator(id_shard, start=last_id))
+    for mapping in mappings:
+        client.register_mapping(mapping)
+    client.factory.transformer_args = transformer_args
+    wakeup = asyncio.Event()
+    space = asyncio.Event()
+    input_done = False
+
+    async def _add(payload: dict[str, Any]) -> None:
+        while client.queue.request_count() >= prefetch:
+            space.clear()
+            await space.wait()
+        try:
+            await client.build_and_add_to_queue(payload, chain_keyword=chain_keyword, extra_args=extra_args)
+        except ValueError as err:
+            outbox.put(_ShardError(shard, str(err)))
+        wakeup.set()
+
+    def _done() -> None:
+        nonlocal input_done
+        input_done = True
+        wakeup.set()
+
+    def _on_result(result: ProcessingResult) -> None:
+        outbox.put(result)
+        space.set()
+
+    threading.Thread(target=_read_inbox, args=(inbox, asyncio.get_running_loop(), _add, _done), daemon=True).start()
+    async with client:
+        # Requests are sent while the inbox is still being read. `process_queue` returns whenever the queue runs dry, so wait for more input
+        while True:
+            wakeup.clear()
+            await client.process_queue(batch_size=batch_size, timeout=timeout, on_result=_on_result, keep_results=False)
+            if client.queue.request_count():
+                continue
+            if input_done:
+                break
+            await wakeup.wait()
+
+
+def _shard_worker(shard: int, *args: Any) -> None:
+    outbox: multiprocessing.Queue = args[4]
+    try:
+        asyncio.run(_run_shard(shard, *args))
+    except Exception as err:
+        outbox.put(_ShardDone(shard, f"{type(err).__name__}: {err}"))
+    else:
+        outbox.put(_ShardDone(shard))
+
+
+class ShardedRunner:
+    """Process requests across several worker processes, each running its own event loop, `ClientSession` and `Aiopulse` client.
+
+    Top-level payloads are distributed round-robin between workers, which start sending as soon as payloads arrive. At most `prefetch` payloads
+    wait in each worker's inbox and queue, so the input is never loaded into memory all at once. Chained requests are built by the worker that sent their parent,
+    so a chain never leaves the process that owns it. Results are streamed back to the caller as workers produce them.
+    Each worker opens its own managed session using the client's `SessionConfig`.
+
+    Mappings (including their schemas, transformers, response processors and matchers) are pickled to the workers, so they must be
+    defined at module level.
+
+    Each worker allocates request ids from its own `IdAllocator` shard (`first_shard` + worker index), so ids are unique across workers.
+    The highest id seen per shard is kept in `last_ids`, and later runs continue after it. To resume in a new process without reusing ids,
+    save `last_ids` and pass it back.
+
+    Args:
+        client (Aiopulse): The client whose registered mappings and transformer arguments are replicated in every worker
+        workers (int | None, optional): Number of worker processes. Defaults to the number of CPUs.
+        start_method (str, optional): The multiprocessing start method. Defaults to "spawn".
+        first_shard (int, optional): Id shard of the first worker. Use different ranges for runners working on shared state at the same time. Defaults to 1.
+        last_ids (dict[int, int] | None, optional): Highest id already allocated per shard, e.g. from a checkpoint. Defaults to None.
+        prefetch (int, optional): Maximum payloads buffered per worker, both in its inbox and built in its queue. Defaults to 1000.
+        poll_interval (float, optional): Seconds between checks for workers that exited without reporting back, e.g. killed or crashed. Defaults to 1.0.
+    """
+
+    logger = logging.getLogger(__name__)
+
+    def __init__(
+        self,
+        client: Aiopulse,
+        workers: int | None = None,
+        start_method: str = "spawn",
+        first_shard: int = 1,
+        last_ids: dict[int, int] | None = None,
+        prefetch: int = 1000,
+        poll_interval: float = 1.0,
+    ) -> None:
+        self.workers = workers or os.cpu_count() or 1
+        if self.workers < 1:
+            raise ValueError("At least one worker is needed")
+        if first_shard < 1 or first_shard + self.workers - 1 > MAX_SHARD:
+            raise ValueError(f"Worker id shards must be between 1 and {MAX_SHARD}")
+        if prefetch < 1:
+            raise ValueError("Prefetch must be at least 1")
+        self.shards = range(first_shard, first_shard + self.workers)
+        self.prefetch = prefetch
+        self.poll_interval = poll_interval
+        self.last_ids: dict[int, int] = dict(last_ids or {})
+        self.mappings = list(client.factory.mappings)
+        self.transformer_args = dict(client.factory.transformer_args)
+        self.session_config = client.sessions.config
+        self.errors: list[str] = []
+        self._context = multiprocessing.get_context(start_method)
+
+    def _feed(self, payloads: Iterable[dict[str, Any]], inboxes: list[multiprocessing.Queue], finished: set[int], stop: threading.Event) -> None:
+        def _put(shard: int, item: Any) -> bool:
+            # Time out regularly, so a full inbox of a worker that died doesn't block forever
+            while shard not in finished and not stop.is_set():
+                try:
+                    inboxes[shard].put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        try:
+            for i, payload in enumerate(payloads):
+                # Skip workers that are gone
+                if not any(_put((i + offset) % len(inboxes), payload) for offset in range(len(inboxes))):
+                    self.logger.error("No shard worker left to send payloads to")
+                    return
+        finally:
+            for shard in range(len(inboxes)):
+                _put(shard, _END_OF_INPUT)
+
+    async def run(self, payloads: Iterable[dict[str, Any]], batch_size: int, timeout: int = 60, chain_keyword: str = "chain", extra_args: dict[str, Any] = dict()) -> AsyncIterator[ProcessingResult]:
+        """Build and send all payloads across the worker processes.
+
+        Payloads that fail to build are logged and recorded in `errors` instead of interrupting the run.
+
+        Args:
+            payloads (Iterable[dict[str, Any]]): Raw input payloads. The iterable is consumed lazily in a background thread.
+            batch_size (int): Batch size used by each worker's `process_queue`
+            timeout (int, optional): Total timeout in seconds for each request. Defaults to 60.
+            chain_keyword (str, optional): Key holding chained payloads. Defaults to "chain".
+            extra_args (dict[str, Any], optional): Additional input arguments passed to the input schema of top-level payloads. Defaults to an empty dictionary.
+
+        Yields:
+            ProcessingResult: Results in the order workers complete them
+        """
+        self.errors = []
+        outbox = self._context.Queue()
+        inboxes = [self._context.Queue(maxsize=self.prefetch) for _ in range(self.workers)]
+        processes = [
+            self._context.Process(
+                target=_shard_worker,
+                args=(
+                    shard,
+                    self.mappings,
+                    self.transformer_args,
+                    self.session_config,
+                    inboxes[shard],
+                    outbox,
+                    batch_size,
+                    timeout,
+                    chain_keyword,
+                    extra_args,
+                    id_shard,
+                    self.last_ids.get(id_shard, 0),
+                    self.prefetch,
+                ),
+                daemon=True,
+            )
+            for shard, id_shard in enumerate(self.shards)
+        ]
+        for process in processes:
+            process.start()
+        self.logger.info("Started %s shard workers", self.workers)
+
+        loop = asyncio.get_running_loop()
+        finished: set[int] = set()
+        stop = threading.Event()
+        feeder = loop.run_in_executor(None, self._feed, payloads, inboxes, finished, stop)
+        try:
+            while len(finished) < self.workers:
+                # Workers that had exited before the outbox was found empty have flushed everything they sent, so they will never report back
+                exited = [shard for shard, process in enumerate(processes) if shard not in finished and process.exitcode is not None]
+                try:
+                    item = await loop.run_in_executor(None, outbox.get, True, self.poll_interval)
+                except queue.Empty:
+                    for shard in exited:
+                        finished.add(shard)
+                        error = f"Shard {shard} exited unexpectedly with code {processes[shard].exitcode}"
+                        self.logger.error(error)
+                        self.errors.append(error)
+                    continue
+                if isinstance(item, ProcessingResult):
+                    id_shard = split_id(item.request.id)[0]
+                    self.last_ids[id_shard] = max(self.last_ids.get(id_shard, 0), item.request.id)
+                    yield item
+                elif isinstance(item, _ShardError):
+                    self.logger.warning("Shard %s failed to build a request. %s", item.shard, item.error)
+                    self.errors.append(item.error)
+                elif isinstance(item, _ShardDone):
+                    finished.add(item.shard)
+                    if item.error:
+                        self.logger.error("Shard %s stopped with error '%s'", item.shard, item.error)
+                        self.errors.append(item.error)
+                    else:
+                        self.logger.info("Shard %s finished", item.shard)
+            await feeder
+        finally:
+            stop.set()
+            for process in processes:
+                if process.is_alive():
+                    process.terminate()
+                process.join()
+            for inbox in inboxes:
+                inbox.cancel_join_thread()
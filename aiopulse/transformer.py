@@ -1,18 +1,110 @@
+from __future__ import annotations
+
 import abc
-from typing import Any
+import copy
+from typing import Any, Callable
+
+from pydantic import BaseModel, ConfigDict, PrivateAttr, field_validator
+from yarl import URL
 
-from pydantic import BaseModel, ConfigDict, field_validator
+from .data_types import Method, SerializableURL, append_url_path, join_url
 
-from .data_types import SerializableURL
+TransformStep = Callable[[dict[str, Any]], dict[str, Any]]
 
 
 class TransformerBase(BaseModel, abc.ABC):
-    model_config = ConfigDict(arbitrary_types_allowed=True)
+    model_config = ConfigDict(arbitrary_types_allowed=True, defer_build=True)
 
     @abc.abstractmethod
     def transform_input(self, input_data: dict[str, Any]) -> dict[str, Any]:
         raise NotImplementedError
 
+    def constant_fields(self) -> dict[str, Any] | None:
+        """Fields this transformer always sets to the same values, whatever the input.
+
+        Override it in transformers that only set constants, so they can be merged into a single update when the pipeline is compiled.
+        Returns `None` (the default) if the output depends on the input.
+        """
+        return None
+
+    def fuse(self, following: TransformerBase) -> TransformerBase | None:
+        """Return a single transformer equivalent to applying this one and then `following`, or `None` if they can't be fused."""
+        return None
+
+
+class CompiledPipeline:
+    """The transformers of a mapping, instantiated once and fused into as few steps as possible.
+
+    Consecutive transformers that only set constant fields are merged into a single update, and adjacent transformers that know how to
+    combine (see `TransformerBase.fuse`) are replaced by their fused version. Transformers are instantiated when the pipeline is compiled,
+    so they must not keep per-request state. A copy of the arguments is kept in `transformer_args` to tell when they changed.
+
+    Args:
+        transformers (list[type[TransformerBase]]): Transformer types, in the order they are applied
+        transformer_args (dict[str, Any]): Arguments passed to the transformer constructors
+    """
+
+    def __init__(self, transformers: list[type[TransformerBase]], transformer_args: dict[str, Any]) -> None:
+        self.transformers = list(transformers)
+        self.transformer_args = copy.deepcopy(transformer_args)
+        self.steps: list[TransformStep] = []
+        instances = [transformer(**transformer_args) for transformer in transformers]
+        constants: dict[str, Any] = {}
+        i = 0
+        while i < len(instances):
+            instance = instances[i]
+            i += 1
+            fields = instance.constant_fields()
+            if fields is not None:
+                constants.update(fields)
+                continue
+            if constants:
+                self.steps.append(self._constant_step(constants))
+                constants = {}
+            while i < len(instances) and (fused := instance.fuse(instances[i])) is not None:
+                instance = fused
+                i += 1
+            self.steps.append(instance.transform_input)
+        if constants:
+            self.steps.append(self._constant_step(constants))
+
+    @staticmethod
+    def _constant_step(constants: dict[str, Any]) -> TransformStep:
+        def _apply(input_data: dict[str, Any]) -> dict[str, Any]:
+            # Copy mutable constants, since later steps may modify them in place
+            input_data.update({key: dict(value) if isinstance(value, dict) else value for key, value in constants.items()})
+            return input_data
+
+        return _apply
+
+    def __call__(self, data: dict[str, Any]) -> dict[str, Any]:
+        copied_data = dict(data)
+        for step in self.steps:
+            copied_data = step(copied_data)
+        return copied_data
+
+
+class SetMethod(TransformerBase):
+    method: Method
+
+    def transform_input(self, input_data: dict[str, Any]) -> dict[str, Any]:
+        input_data["method"] = self.method
+        return input_data
+
+    def constant_fields(self) -> dict[str, Any] | None:
+        return {"method": self.method}
+
+
+class SetHeaders(TransformerBase):
+    headers: dict[str, str]
+
+    def transform_input(self, input_data: dict[str, Any]) -> dict[str, Any]:
+        input_data["headers"] = dict(self.headers)
+        return input_data
+
+    def constant_fields(self) -> dict[str, Any] | None:
+        return {"headers": self.headers}
+
 
 class AddBaseURL(TransformerBase):
     base_url: SerializableURL
@@ -27,17 +119,23 @@ class AddBaseURL(TransformerBase):
         return v
 
     def transform_input(self, input_data: dict[str, Any]) -> dict[str, Any]:
-        url: SerializableURL | None = input_data.get("url")
+        url: URL | None = input_data.get("url")
         if not url:
             input_data["url"] = self.base_url
         else:
-            if not isinstance(url, SerializableURL):
+            # Schemas may validate URL inputs to plain URLs (see `SerializableURL`)
+            if not isinstance(url, URL):
                 raise ValueError("Input url needs to be a URL instance")
             if url.is_absolute():
                 raise ValueError("Expected input url to be relative but got absolute. Cannot combine with base url.")
-            input_data["url"] = self.base_url.joinpath(str(url), encoded=True)  # type: ignore - necessary because for some reason the linter thinks the "encoded" parameter is not part of this method's signature.
+            input_data["url"] = join_url(self.base_url, str(url))
         return input_data
 
+    def fuse(self, following: TransformerBase) -> TransformerBase | None:
+        if type(self) is AddBaseURL and type(following) is AddPathToURL:
+            return AddBaseURLWithPath(base_url=self.base_url, path_to_add=following.path_to_add)
+        return None
+
 
 class AddPathToURL(TransformerBase):
     path_to_add: SerializableURL
@@ -50,7 +148,23 @@ class AddPathToURL(TransformerBase):
         return v
 
     def transform_input(self, input_data: dict[str, Any]) -> dict[str, Any]:
-        url: SerializableURL = input_data["url"]
-        qstring = url.query_string
-        input_data["url"] = url.with_path(url.path + self.path_to_add.path) % qstring
+        input_data["url"] = append_url_path(input_data["url"], self.path_to_add.path)
+        return input_data
+
+
+class AddBaseURLWithPath(AddBaseURL):
+    """`AddBaseURL` followed by `AddPathToURL`, with the URL for inputs that have no url of their own computed only once."""
+
+    path_to_add: SerializableURL
+    _full_url: SerializableURL = PrivateAttr()
+
+    def model_post_init(self, __context: Any) -> None:
+        self._full_url = append_url_path(self.base_url, self.path_to_add.path)
+
+    def transform_input(self, input_data: dict[str, Any]) -> dict[str, Any]:
+        if not input_data.get("url"):
+            input_data["url"] = self._full_url
+            return input_data
+        input_data = super().transform_input(input_data)
+        input_data["url"] = append_url_path(input_data["url"], self.path_to_add.path)
         return input_data
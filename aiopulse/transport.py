@@ -0,0 +1,213 @@
+"""Transports send prepared requests on behalf of `Aiopulse.send`.
+
+`HttpTransport` sends them over the network. `RecordingTransport` does the same and captures every response into an archive,
+which `ReplayTransport` serves back from memory-mapped storage, so response processors and chains can be run offline at full speed.
+
+An archive is a single file: the response bodies back to back, followed by a JSON index of the responses, the offset of the index as
+an 8-byte little-endian integer and a magic marker.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import mmap
+import struct
+import time
+from pathlib import Path
+from typing import Any, AsyncIterable
+
+import aiohttp
+from multidict import CIMultiDict, CIMultiDictProxy
+from yarl import URL
+
+from .request import encode_json
+
+ARCHIVE_MAGIC = b"AIOPULSE-REPLAY-1"
+_TRAILER = struct.Struct("<Q")
+
+
+class ReplayMiss(aiohttp.ClientError):
+    """Raised when a replayed request has no recorded response."""
+
+
+def request_key(params: dict[str, Any]) -> str:
+    """Identify a prepared request by its method, URL and a digest of its body. Streamed bodies can only be sent once, so they are not part of the key."""
+    if params.get("json") is not None:
+        body = encode_json(params["json"])
+    elif isinstance(params.get("data"), (bytes, bytearray, memoryview)):
+        body = bytes(params["data"])
+    elif isinstance(params.get("data"), dict):
+        body = json.dumps(params["data"], sort_keys=True, default=str).encode()
+    else:
+        body = b""
+    key = f"{params['method']} {params['url']}"
+    return f"{key} {hashlib.blake2b(body, digest_size=8).hexdigest()}" if body else key
+
+
+class HttpTransport:
+    """Send requests with the given `aiohttp.ClientSession`."""
+
+    async def request(self, session: aiohttp.ClientSession, timeout: float, params: dict[str, Any]) -> aiohttp.ClientResponse:
+        return await session.request(timeout=aiohttp.ClientTimeout(total=timeout), **params)
+
+    async def close(self) -> None:
+        pass
+
+
+class RecordingTransport(HttpTransport):
+    """Send requests over the network and record each response (status, reason, headers, body and latency) into an archive.
+
+    Bodies are appended to the archive as responses arrive. The index is written when the transport is closed, which `Aiopulse.close` does.
+    """
+
+    logger = logging.getLogger(__name__)
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self._file = open(self.path, "wb")
+        self._offset = 0
+        self._index: list[dict[str, Any]] = []
+
+    async def request(self, session: aiohttp.ClientSession, timeout: float, params: dict[str, Any]) -> aiohttp.ClientResponse:
+        started = time.perf_counter()
+        resp = await super().request(session, timeout, params)
+        # aiohttp keeps the body it read, so response processors can still read it afterwards
+        body = await resp.read()
+        self._file.write(body)
+        self._index.append(
+            {
+                "key": request_key(params),
+                "method": resp.method,
+                "url": str(resp.url),
+                "status": resp.status,
+                "reason": resp.reason,
+                "headers": list(resp.headers.items()),
+                "offset": self._offset,
+                "length": len(body),
+                "latency": time.perf_counter() - started,
+            }
+        )
+        self._offset += len(body)
+        return resp
+
+    @property
+    def recorded(self) -> int:
+        return len(self._index)
+
+    async def close(self) -> None:
+        if self._file.closed:
+            return
+        self._file.write(json.dumps(self._index, separators=(",", ":")).encode())
+        self._file.write(_TRAILER.pack(self._offset) + ARCHIVE_MAGIC)
+        self._file.close()
+        self.logger.info("Recorded %s responses to %s", len(self._index), self.path)
+
+
+class ReplayResponse:
+    """Stands in for `aiohttp.ClientResponse` when replaying, with the attributes and methods response processors usually rely on."""
+
+    def __init__(self, entry: dict[str, Any], body: bytes) -> None:
+        self.method: str = entry["method"]
+        self.url = URL(entry["url"], encoded=True)
+        self.status: int = entry["status"]
+        self.reason: str | None = entry["reason"]
+        self.headers = CIMultiDictProxy(CIMultiDict(entry["headers"]))
+        self._body = body
+
+    @property
+    def ok(self) -> bool:
+        return self.status < 400
+
+    @property
+    def content_type(self) -> str:
+        return self.headers.get("Content-Type", "application/octet-stream").split(";")[0].strip()
+
+    @property
+    def charset(self) -> str | None:
+        for param in self.headers.get("Content-Type", "").split(";")[1:]:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "charset":
+                return value.strip().strip('"')
+        return None
+
+    async def read(self) -> bytes:
+        return self._body
+
+    async def text(self, encoding: str | None = None) -> str:
+        return self._body.decode(encoding or self.charset or "utf-8")
+
+    async def json(self, *, encoding: str | None = None, loads: Any = json.loads, content_type: str | None = "application/json") -> Any:
+        if not self._body.strip():
+            return None
+        return loads(self._body.decode(encoding or self.charset or "utf-8"))
+
+    def raise_for_status(self) -> None:
+        if not self.ok:
+            raise aiohttp.ClientResponseError(None, (), status=self.status, message=self.reason or "", headers=self.headers)  # type: ignore
+
+    def release(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class ReplayTransport(HttpTransport):
+    """Serve recorded responses instead of sending requests. The session is never used.
+
+    Requests are matched by method, URL and body (see `request_key`). When the same request was recorded several times, its responses are replayed in order, starting over once exhausted.
+
+    Args:
+        path (str | Path): An archive written by `RecordingTransport`
+        latency (float | None, optional): Seconds to wait before each response, to simulate the network. Defaults to None (no delay).
+        recorded_latency (bool, optional): Wait as long as each response originally took instead of a fixed latency. Defaults to False.
+    """
+
+    logger = logging.getLogger(__name__)
+
+    def __init__(self, path: str | Path, latency: float | None = None, recorded_latency: bool = False) -> None:
+        self.path = Path(path)
+        self.latency = latency
+        self.recorded_latency = recorded_latency
+        with open(self.path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        trailer_size = _TRAILER.size + len(ARCHIVE_MAGIC)
+        if len(self._mmap) < trailer_size or self._mmap[-len(ARCHIVE_MAGIC) :] != ARCHIVE_MAGIC:
+            self._mmap.close()
+            raise ValueError(f"{self.path} is not a complete replay archive")
+        (index_offset,) = _TRAILER.unpack_from(self._mmap, len(self._mmap) - trailer_size)
+        self._responses: dict[str, list[dict[str, Any]]] = dict()
+        for entry in json.loads(self._mmap[index_offset : len(self._mmap) - trailer_size]):
+            self._responses.setdefault(entry["key"], []).append(entry)
+        self._served: dict[str, int] = dict()
+        self.logger.info("Loaded %s recorded responses for %s requests from %s", sum(map(len, self._responses.values())), len(self._responses), self.path)
+
+    def _delay(self, entry: dict[str, Any]) -> float:
+        if self.recorded_latency:
+            return entry["latency"]
+        return self.latency or 0.0
+
+    async def request(self, session: aiohttp.ClientSession, timeout: float, params: dict[str, Any]) -> ReplayResponse:  # type: ignore
+        if isinstance(params.get("data"), AsyncIterable):
+            # Consume streamed bodies like a real upload would
+            async for _ in params["data"]:
+                pass
+        key = request_key(params)
+        entries = self._responses.get(key)
+        if not entries:
+            raise ReplayMiss(f"No recorded response for {key}")
+        served = self._served.get(key, 0)
+        self._served[key] = served + 1
+        entry = entries[served % len(entries)]
+        delay = self._delay(entry)
+        if delay > timeout:
+            await asyncio.sleep(timeout)
+            raise asyncio.TimeoutError()
+        if delay:
+            await asyncio.sleep(delay)
+        return ReplayResponse(entry, self._mmap[entry["offset"] : entry["offset"] + entry["length"]])
+
+    async def close(self) -> None:
+        if not self._mmap.closed:
+            self._mmap.close()
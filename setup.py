@@ -8,4 +8,5 @@ setup(
     author_email="btonasse@notyet.com",
     packages=["aiopulse"],
     install_requires=["aiohttp", "yarl", "pydantic"],
+    extras_require={"zstd": ["zstandard"]},
 )
@@ -58,6 +58,15 @@ def dummy_request(request, dummy_processed_response):
         m.method = mock.Mock()
         m.headers = dict()
         m.form_data = params.get("form_data") or dict()
+        m.encoded_body = params.get("encoded_body")
+        m.encoded_body_compressed = params.get("encoded_body_compressed", False)
+        m.body_stream = params.get("body_stream")
+        m.compression = params.get("compression")
+        m.priority = params.get("priority", 0)
+        m.tenant = params.get("tenant")
+        m.mapping_title = params.get("mapping_title")
+        m.deadline = params.get("deadline")
+        m.remaining_time.return_value = None
         m.process_response.return_value = dummy_processed_response()
         m.prepare.return_value = {"method": "GET", "url": "https://www.somehost.com/somepath", "headers": dict(), "json": dict()}
         return m
@@ -1,10 +1,15 @@
 import asyncio
+import time
 from unittest.mock import AsyncMock, MagicMock
 
 import aiohttp
 import pytest
+from aiohttp import web
 
-from aiopulse import Aiopulse, ProcessedResponse, RequestQueue
+from aiopulse import Aiopulse, ProcessedResponse, Request, RequestQueue
+from aiopulse.monitor import LoopMonitor
+from aiopulse.progress import ProgressTracker
+from aiopulse.queue import PriorityScheduler
 
 
 @pytest.fixture
@@ -50,10 +55,11 @@ class TestClient:
         client = Aiopulse()
         client.queue = dummy_queue
         monkeypatch.setattr(Aiopulse, "send", mock_send)
+        received = []
         async with aiohttp.ClientSession() as session:
-            results = await client.process_queue(session, 10, 1)
-        assert len(results) == 2
-        assert completion_order == expected_order
+            results = await client.process_queue(session, 10, 1, on_result=received.append)
+        assert [result.request.id for result in results] == [1, 2]
+        assert [result.request.id for result in received] == completion_order == expected_order
 
     @pytest.mark.parametrize(
         "mock_request_method, dummy_request, expected_status",
@@ -70,3 +76,163 @@ class TestClient:
             resp = await client.send(session, dummy_request())
         assert isinstance(resp, ProcessedResponse)
         assert resp.status == expected_status
+
+    async def test_monitor(self, mock_request_method, monkeypatch, dummy_request, loop):
+        client = Aiopulse(monitor=LoopMonitor(interval=0.001))
+        request = dummy_request()
+        request.process_response.return_value = ProcessedResponse(ok=True, status=200)
+        await client.queue.add(request)
+        monkeypatch.setattr(aiohttp.ClientSession, "request", mock_request_method)
+        async with aiohttp.ClientSession() as session:
+            await client.process_queue(session, 10, 1)
+        stats = client.loop_stats()
+        assert not client.monitor.running
+        assert stats.network_time > 0
+        assert 0 < stats.network_ratio <= 1
+        assert Aiopulse().loop_stats() is None
+
+    async def test_monitor_slow_body(self, aiohttp_server, payload, loop):
+        async def handler(request):
+            resp = web.StreamResponse(headers={"Content-Type": "application/json"})
+            await resp.prepare(request)
+            await resp.write(b'{"items": ')
+            await asyncio.sleep(0.2)
+            await resp.write(b"[]}")
+            return resp
+
+        app = web.Application()
+        app.router.add_post("/", handler)
+        server = await aiohttp_server(app)
+
+        async def processor(response, request):
+            return ProcessedResponse(ok=True, status=response.status, content=[await response.json()])
+
+        client = Aiopulse(monitor=LoopMonitor(interval=0.01))
+        await client.queue.add(Request(**payload | {"url": str(server.make_url("/"))}, response_processor=processor))
+        async with client:
+            results = await client.process_queue()
+        stats = client.loop_stats()
+        assert results[0].response.content == [{"items": []}]
+        assert stats.network_time >= 0.2
+        assert stats.network_ratio > 0.9
+
+    async def test_send_after_deadline(self, mock_request_method, monkeypatch, payload, dummy_processor, loop):
+        client = Aiopulse()
+        monkeypatch.setattr(aiohttp.ClientSession, "request", mock_request_method)
+        request = Request(**payload, deadline=time.monotonic() - 1, response_processor=dummy_processor)
+        async with aiohttp.ClientSession() as session:
+            resp = await client.send(session, request)
+        assert not resp.ok
+        assert resp.error == "Deadline exceeded"
+        mock_request_method.assert_not_called()
+
+    async def test_job_deadline(self, aiohttp_server, payload, loop):
+        async def handler(request):
+            await asyncio.sleep(0.5)
+            return web.json_response({})
+
+        app = web.Application()
+        app.router.add_post("/", handler)
+        server = await aiohttp_server(app)
+
+        async def processor(response, request):
+            return ProcessedResponse(ok=True, status=response.status)
+
+        client = Aiopulse()
+        for _ in range(3):
+            await client.queue.add(Request(**payload | {"url": str(server.make_url("/"))}, response_processor=processor))
+        started = time.monotonic()
+        async with client:
+            results = await client.process_queue(batch_size=1, deadline=0.2)
+        assert time.monotonic() - started < 0.5
+        assert len(results) == 3
+        assert not any(result.response.ok for result in results)
+        assert [result.response.error for result in results[1:]] == ["Deadline exceeded", "Deadline exceeded"]
+
+    async def test_priority_queue(self, dummy_request, loop):
+        progress = ProgressTracker()
+        client = Aiopulse(compact_queue=True, progress=progress, priority=True, fairness="tenant", chain_first=True)
+        assert client.queue.compact and client.queue.progress is progress
+        assert isinstance(client.queue._queue, PriorityScheduler)
+        assert (client.queue._queue.fairness, client.queue._queue.chain_first) == ("tenant", True)
+        for i, priority in enumerate([0, 5]):
+            request = dummy_request(i + 1)
+            request.priority = priority
+            await client.queue.add(request)
+        assert progress.queued == 2
+        assert client.queue.get().id == 2
+
+
+class TestLifecycle:
+    @pytest.fixture
+    async def slow_client(self, dummy_request, monkeypatch):
+        async def slow_send(self, session, request, timeout):
+            await asyncio.sleep(request.body["delay"])
+            return ProcessedResponse(ok=True, status=200)
+
+        monkeypatch.setattr(Aiopulse, "send", slow_send)
+        client = Aiopulse()
+        for i, delay in enumerate([0.01, 0.01, 0.01, 0.01, 1]):
+            request = dummy_request(i + 1)
+            request.body = {"delay": delay}
+            await client.queue.add(request)
+        return client
+
+    async def test_discard_results(self, slow_client, loop):
+        received = []
+        task = asyncio.create_task(slow_client.process_queue(MagicMock(), batch_size=2, on_result=received.append, keep_results=False))
+        await asyncio.sleep(0.05)
+        slow_client.cancel()
+        assert await task == slow_client.last_results == []
+        assert [result.request.id for result in received] == [1, 2, 3, 4, 5]
+
+    async def test_pause_resume(self, slow_client, loop):
+        slow_client.pause()
+        task = asyncio.create_task(slow_client.process_queue(MagicMock(), batch_size=2))
+        await asyncio.sleep(0.05)
+        assert slow_client.paused
+        assert slow_client.queue.request_count() == 5
+        slow_client.resume()
+        await asyncio.sleep(0.001)
+        slow_client.pause()
+        await asyncio.sleep(0.05)
+        assert slow_client.queue.request_count() == 3
+        slow_client.drain()
+        assert len(await task) == 2
+
+    async def test_drain(self, slow_client, loop):
+        task = asyncio.create_task(slow_client.process_queue(MagicMock(), batch_size=2))
+        await asyncio.sleep(0.005)
+        slow_client.drain()
+        results = await task
+        assert [result.request.id for result in results] == [1, 2]
+        assert slow_client.queue.request_count() == 3
+
+    async def test_cancel(self, slow_client, loop):
+        task = asyncio.create_task(slow_client.process_queue(MagicMock(), batch_size=5))
+        await asyncio.sleep(0.05)
+        slow_client.cancel()
+        results = await task
+        assert [result.response.ok for result in results] == [True, True, True, True, False]
+        assert results[-1].response.error == "Cancelled"
+        assert not slow_client._inflight
+
+    async def test_task_cancelled(self, slow_client, loop):
+        task = asyncio.create_task(slow_client.process_queue(MagicMock(), batch_size=2))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert len(slow_client.last_results) == 4
+        assert not slow_client._inflight
+
+    async def test_task_cancelled_mid_batch(self, slow_client, loop):
+        received = []
+        task = asyncio.create_task(slow_client.process_queue(MagicMock(), batch_size=5, on_result=received.append))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert [result.request.id for result in slow_client.last_results] == [1, 2, 3, 4]
+        assert received == slow_client.last_results
+        assert not slow_client._inflight
@@ -0,0 +1,75 @@
+import gzip
+
+import aiohttp
+import pytest
+from aiohttp import web
+
+from aiopulse import Request
+from aiopulse.data_types import Compression
+from aiopulse.encoding import compress, compress_stream, file_chunks, zstd_available
+
+
+async def _chunks(*chunks: bytes):
+    for chunk in chunks:
+        yield chunk
+
+
+@pytest.fixture
+def upload_file(tmp_path):
+    path = tmp_path / "upload.bin"
+    path.write_bytes(b"x" * 200_000)
+    return path
+
+
+class TestEncoding:
+    def test_compress_gzip(self):
+        assert gzip.decompress(compress(memoryview(b"hello" * 100), Compression.GZIP)) == b"hello" * 100
+
+    async def test_compress_stream(self, loop):
+        compressed = b"".join([chunk async for chunk in compress_stream(_chunks(b"abc", b"def"), Compression.GZIP)])
+        assert gzip.decompress(compressed) == b"abcdef"
+
+    async def test_file_chunks(self, upload_file, loop):
+        chunks = [chunk async for chunk in file_chunks(upload_file, chunk_size=65536)]
+        assert len(chunks) == 4
+        assert b"".join(chunks) == upload_file.read_bytes()
+
+    @pytest.mark.skipif(zstd_available(), reason="zstd is available")
+    def test_zstd_unavailable(self, payload, dummy_processor):
+        with pytest.raises(ValueError):
+            compress(b"abc", Compression.ZSTD)
+        with pytest.raises(ValueError):
+            Request(**payload, compression="zstd", response_processor=dummy_processor)
+
+
+class TestStreamingUpload:
+    @pytest.fixture
+    async def server(self, aiohttp_server):
+        async def handler(request: web.Request):
+            # aiohttp decompresses request bodies based on Content-Encoding
+            raw = await request.read()
+            return web.json_response({"size": len(raw), "chunked": request.headers.get("Transfer-Encoding") == "chunked"})
+
+        app = web.Application()
+        app.router.add_post("/", handler)
+        return await aiohttp_server(app)
+
+    @pytest.mark.parametrize("compression", [None, "gzip"])
+    async def test_upload_file(self, server, upload_file, compression, dummy_processor, loop):
+        req = Request(description="Upload", url=str(server.make_url("/")), method="POST", body_stream=upload_file, compression=compression, response_processor=dummy_processor)
+        async with aiohttp.ClientSession() as session:
+            async with session.request(**req.prepare()) as resp:
+                assert await resp.json() == {"size": 200_000, "chunked": True}
+
+    async def test_compressed_body(self, server, dummy_processor, loop):
+        req = Request(description="Upload", url=str(server.make_url("/")), method="POST", body={"a": "b" * 1000}, compression="gzip", response_processor=dummy_processor)
+        prepared = req.prepare()
+        assert prepared["headers"]["Content-Encoding"] == "gzip"
+        assert len(prepared["data"]) < 1000
+        async with aiohttp.ClientSession() as session:
+            async with session.request(**prepared) as resp:
+                assert (await resp.json())["size"] == len(b'{"a":"' + b"b" * 1000 + b'"}')
+
+    def test_stream_and_body(self, payload, dummy_processor):
+        with pytest.raises(ValueError):
+            Request(**payload, body_stream=_chunks(b"a"), response_processor=dummy_processor)
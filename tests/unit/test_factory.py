@@ -1,8 +1,18 @@
 from typing import Any
 
+import gzip
+import json
+import os
+import time
+
 import pytest
+from yarl import URL
 
+import aiopulse.factory as factory_module
 from aiopulse import GenericInputSchema, Request, RequestBuildMapping, RequestFactory, TransformerBase
+from aiopulse.data_types import IdAllocator, split_id
+from aiopulse.profiling import synthetic_factory, synthetic_payloads
+from aiopulse.transformer import AddBaseURL
 
 
 @pytest.fixture
@@ -71,3 +81,102 @@ class TestRequestFactory:
 
     def test_is_match(self, payload, dummy_mapping: RequestBuildMapping):
         assert dummy_mapping.is_match(payload)
+
+    def test_catalog(self, setup_factory: RequestFactory, dummy_mapping: RequestBuildMapping):
+        catalog = setup_factory.catalog()
+        blob = setup_factory.catalog_bytes()
+        assert json.loads(blob) == catalog == [dummy_mapping.get_input_schema()]
+        assert setup_factory.catalog_bytes() is blob
+        setup_factory.register_mapping(dummy_mapping.model_copy(update={"title": "Other"}))
+        assert [entry["title"] for entry in json.loads(setup_factory.catalog_bytes())] == ["Dummy", "Other"]
+        setup_factory.mappings[0].description = "Edited"
+        assert setup_factory.catalog()[0]["description"] == "Edited"
+
+    @pytest.mark.parametrize("url", ["items/1", URL("items/1")])
+    def test_cached_url_join(self, factory: RequestFactory, dummy_processor, always_true, url):
+        factory.register_mapping(
+            RequestBuildMapping(title="Base", description="", input_schema=GenericInputSchema, transformers=[AddBaseURL], response_processor=dummy_processor, is_match=always_true)
+        )
+        factory.transformer_args = {"base_url": "https://www.somehost.com/api"}
+        req = factory.build_request({"description": "relative", "url": url, "method": "GET", "query_params": {"a": "1"}})
+        assert str(req.url) == "https://www.somehost.com/api/items/1?a=1"
+        assert type(req.prepare()["url"]) is URL
+
+    def test_id_allocator(self, setup_factory: RequestFactory, payload):
+        setup_factory.id_allocator = IdAllocator(7)
+        ids = [setup_factory.build_request(payload).id for _ in range(3)]
+        assert len(set(ids)) == 3
+        assert all(split_id(id)[0] == 7 for id in ids)
+
+    def test_preserialize_bodies(self, setup_factory: RequestFactory, payload):
+        assert setup_factory.build_request(payload).encoded_body is None
+        setup_factory.preserialize_bodies = True
+        req = setup_factory.build_request(payload)
+        assert json.loads(req.encoded_body) == payload["body"]
+
+    async def test_serialize_in_thread(self, setup_factory: RequestFactory, payload):
+        setup_factory.preserialize_bodies = True
+        setup_factory.serialize_in_thread = True
+        req = await setup_factory.build_request_async(payload)
+        assert json.loads(req.encoded_body) == payload["body"]
+
+    def test_mapping_compression(self, setup_factory: RequestFactory, payload):
+        setup_factory.mappings[0].compression = "gzip"
+        assert setup_factory.build_request(payload).compression == "gzip"
+
+    @pytest.mark.parametrize("in_thread", [False, True])
+    async def test_precompressed_body(self, setup_factory: RequestFactory, payload, monkeypatch, in_thread):
+        setup_factory.mappings[0].compression = "gzip"
+        setup_factory.preserialize_bodies = True
+        setup_factory.serialize_in_thread = in_thread
+        req = await setup_factory.build_request_async(payload)
+        assert req.encoded_body_compressed
+        assert json.loads(gzip.decompress(req.encoded_body)) == payload["body"]
+        monkeypatch.setattr("aiopulse.request.compress", lambda *args: pytest.fail("compressed again at send time"))
+        params = req.prepare()
+        assert params["data"] is req.encoded_body
+        assert params["headers"]["Content-Encoding"] == "gzip"
+
+    @pytest.mark.parametrize("payload, expected_priority", [({}, 3), ({"priority": 7}, 7)], indirect=["payload"])
+    def test_priority(self, setup_factory: RequestFactory, payload, expected_priority):
+        setup_factory.mappings[0].priority = 3
+        req = setup_factory.build_request(payload | {"tenant": "acme"})
+        assert req.priority == expected_priority
+        assert req.tenant == "acme"
+        assert req.mapping_title == "Dummy"
+
+    def test_deadline(self, setup_factory: RequestFactory, payload):
+        assert setup_factory.build_request(payload).deadline is None
+        setup_factory.mappings[0].deadline = 30
+        now = time.monotonic()
+        assert now + 29 < setup_factory.build_request(payload).deadline <= time.monotonic() + 30
+        assert setup_factory.build_request(payload | {"deadline": 5}).deadline <= time.monotonic() + 5
+        assert setup_factory.build_request(payload, deadline=now + 1).deadline == now + 1
+
+
+class TestBuildBulk:
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_build_bulk(self, workers):
+        factory = synthetic_factory()
+        payloads = synthetic_payloads(5)
+        payloads.insert(2, {"description": "no url"})
+        result = factory.build_bulk(payloads, workers=workers, chunk_size=2)
+        assert list(result.requests) == [0, 1, 3, 4, 5]
+        assert [error.index for error in result.errors] == [2]
+        assert len({record.id for record in result.requests.values()}) == 5
+        request = result.requests[3].materialize()
+        assert request.description == "Synthetic request 2"
+        assert request.response_processor is factory.mappings[0].response_processor
+        assert request.headers == {"x-request-index": "2"}
+
+    def test_build_bulk_chunks(self, monkeypatch):
+        # A single CPU host builds in process instead of starting a pool
+        monkeypatch.setattr(os, "cpu_count", lambda: 1)
+        monkeypatch.setattr(factory_module, "ProcessPoolExecutor", None)
+        factory = synthetic_factory()
+        payloads = synthetic_payloads(5)
+        payloads.insert(2, {"description": "no url"})
+        chunks = factory.build_bulk_chunks(payloads, chunk_size=2)
+        first = next(chunks)
+        assert list(first.requests) == [0, 1] and not first.errors
+        assert [(list(chunk.requests), [error.index for error in chunk.errors]) for chunk in chunks] == [([3], [2]), ([4, 5], [])]
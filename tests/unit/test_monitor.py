@@ -0,0 +1,42 @@
+import asyncio
+import logging
+import time
+
+import pytest
+
+from aiopulse.monitor import LoopMonitor
+
+
+class TestLoopMonitor:
+    async def test_measures_lag(self, loop):
+        monitor = LoopMonitor(interval=0.01)
+        monitor.start()
+        await asyncio.sleep(0.02)
+        time.sleep(0.05)
+        await asyncio.sleep(0.02)
+        await monitor.stop()
+        stats = monitor.stats()
+        assert not monitor.running
+        assert stats.samples > 0
+        assert stats.max_lag >= 0.03
+
+    def test_lag_warning(self, caplog):
+        monitor = LoopMonitor(lag_threshold=0.1)
+        with caplog.at_level(logging.WARNING, logger="aiopulse.monitor"):
+            monitor.record_lag(0.05)
+            assert not caplog.records
+            monitor.record_lag(0.2)
+        assert len(caplog.records) == 1
+        assert monitor.stats().mean_lag == pytest.approx(0.125)
+
+    def test_network_ratio(self):
+        monitor = LoopMonitor()
+        monitor.record_network(3.0)
+        monitor.record_processor(1.0)
+        assert monitor.stats().network_ratio == pytest.approx(0.75)
+        monitor.reset()
+        assert monitor.stats().network_ratio == 0.0
+
+    def test_invalid_interval(self):
+        with pytest.raises(ValueError):
+            LoopMonitor(interval=0)
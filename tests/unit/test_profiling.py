@@ -0,0 +1,60 @@
+import pstats
+import subprocess
+import sys
+
+import pytest
+
+import aiopulse
+from aiopulse.profiling import STAGES, measure_import_time, measure_queue_memory, profile_build, synthetic_factory, synthetic_payloads
+
+
+class TestProfileBuild:
+    def test_stage_breakdown(self):
+        profile = profile_build(synthetic_factory(), synthetic_payloads(20))
+        assert profile.payloads == 20
+        assert profile.failures == 0
+        assert set(profile.stages) == set(STAGES)
+        assert all(elapsed > 0 for elapsed in profile.stages.values())
+        assert "20/20" in profile.report()
+
+    def test_measures_factory_build(self):
+        factory = synthetic_factory()
+        factory.preserialize_bodies = True
+        idle = profile_build(synthetic_factory(), synthetic_payloads(50))
+        profile = profile_build(factory, synthetic_payloads(50))
+        assert factory.stage_timings is None
+        assert profile.stages["serialize"] > idle.stages["serialize"]
+
+    def test_failures_are_counted(self):
+        payloads = synthetic_payloads(2) + [{"description": "no url"}]
+        profile = profile_build(synthetic_factory(), payloads)
+        assert profile.payloads == 3
+        assert profile.failures == 1
+
+    def test_cprofile_dump(self, tmp_path):
+        path = tmp_path / "build.prof"
+        profile_build(synthetic_factory(), synthetic_payloads(5), cprofile_path=str(path))
+        assert pstats.Stats(str(path)).total_calls > 0
+
+
+def test_queue_memory():
+    memory = measure_queue_memory(synthetic_factory(), synthetic_payloads(50))
+    assert memory.items == 50
+    assert 0 < memory.record_bytes < memory.request_bytes
+
+
+def test_lazy_import():
+    script = "import sys, aiopulse\nassert not {'aiohttp', 'pydantic', 'yarl', 'aiopulse.client'} & set(sys.modules)\naiopulse.Aiopulse\nassert 'aiopulse.client' in sys.modules"
+    subprocess.run([sys.executable, "-c", script], check=True)
+    # Submodules resolve on first access without importing the exported classes
+    script = "import sys, aiopulse\naiopulse.response.simple_json_processor\naiopulse.data_types.IdAllocator\nassert 'aiopulse.client' not in sys.modules"
+    subprocess.run([sys.executable, "-c", script], check=True)
+    assert set(aiopulse.__all__) <= set(dir(aiopulse))
+    with pytest.raises(AttributeError):
+        aiopulse.NotExported
+
+
+def test_import_time():
+    profile = measure_import_time(runs=1, scenarios=["lazy"])
+    assert profile.timings["lazy"] > 0
+    assert "lazy" in profile.report()
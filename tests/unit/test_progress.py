@@ -0,0 +1,117 @@
+import asyncio
+import time
+from unittest.mock import MagicMock
+
+import pytest
+from aiohttp import web
+
+from aiopulse import Aiopulse, GenericInputSchema, ProcessedResponse, RequestBuildMapping
+from aiopulse.progress import ProgressTracker
+from aiopulse.response import simple_json_processor
+
+
+class TestProgressTracker:
+    def test_counts(self):
+        tracker = ProgressTracker()
+        for _ in range(3):
+            tracker.enqueued()
+        tracker.deferred_added(4)
+        tracker.dequeued()
+        tracker.completed("A", ok=True)
+        tracker.enqueued(from_deferred=True)
+        tracker.skip(2)
+        snapshot = tracker.snapshot()
+        assert (snapshot.queued, snapshot.in_flight, snapshot.deferred, snapshot.skipped) == (3, 0, 1, 2)
+        assert snapshot.total == 7
+        assert snapshot.mappings["A"].succeeded == 1
+
+    def test_throughput_and_eta(self, monkeypatch):
+        now = [100.0]
+        monkeypatch.setattr(time, "monotonic", lambda: now[0])
+        tracker = ProgressTracker(alpha=0.5, sample_interval=1.0)
+        for _ in range(20):
+            tracker.enqueued()
+        tracker.start()
+
+        def complete(count: int, seconds: float) -> float:
+            for _ in range(count):
+                tracker.dequeued()
+                tracker.completed("A", ok=True)
+            now[0] += seconds
+            return tracker.snapshot().throughput
+
+        assert complete(4, 1.0) == 4
+        assert complete(8, 1.0) == 6
+        snapshot = tracker.snapshot()
+        assert snapshot.eta == pytest.approx(8 / 6)
+        assert snapshot.elapsed == 2.0
+
+    def test_callback(self):
+        snapshots = []
+        tracker = ProgressTracker(on_progress=snapshots.append, report_interval=0.01)
+        tracker.start()
+        tracker.enqueued()
+        tracker.dequeued()
+        time.sleep(0.02)
+        tracker.completed(None, ok=False)
+        assert len(snapshots) == 1
+        assert snapshots[0].mappings["unmapped"].failed == 1
+
+    def test_invalid(self):
+        with pytest.raises(ValueError):
+            ProgressTracker(alpha=0)
+
+
+async def test_client_progress(aiohttp_server):
+    async def handler(request):
+        if request.path == "/fail":
+            return web.Response(status=500)
+        return web.json_response({})
+
+    app = web.Application()
+    app.router.add_get("/{tail:.*}", handler)
+    server = await aiohttp_server(app)
+
+    def payload(path: str, chain: list | None = None) -> dict:
+        return {"description": path, "url": str(server.make_url(path)), "method": "GET", "chain": chain}
+
+    snapshots = []
+    client = Aiopulse(progress=ProgressTracker(on_progress=snapshots.append))
+    client.register_mapping(
+        RequestBuildMapping(title="Json", description="Json", input_schema=GenericInputSchema, transformers=[], response_processor=simple_json_processor, is_match=lambda data: True)
+    )
+    await client.build_and_add_to_queue(payload("/ok", chain=[payload("/child", chain=[payload("/grandchild")])]))
+    await client.build_and_add_to_queue(payload("/fail", chain=[payload("/skipped"), payload("/skipped")]))
+    assert client.progress_snapshot().total == 6
+    async with client:
+        await client.process_queue()
+
+    snapshot = client.progress_snapshot()
+    assert snapshots[-1].completed == snapshot.completed == 4
+    assert (snapshot.succeeded, snapshot.failed, snapshot.skipped, snapshot.remaining) == (3, 1, 2, 0)
+    assert snapshot.mappings["Json"].succeeded == 3
+    assert client.queue.deferred_count() == 0
+
+
+@pytest.mark.parametrize("interrupt", ["cancel", "raise"])
+async def test_client_progress_interrupted(interrupt, dummy_request, monkeypatch):
+    async def send(self, session, request, timeout):
+        if request.id == 2:
+            if interrupt == "raise":
+                raise RuntimeError("Processor failed")
+            await asyncio.sleep(1)
+        return ProcessedResponse(ok=True, status=200)
+
+    monkeypatch.setattr(Aiopulse, "send", send)
+    client = Aiopulse(progress=ProgressTracker())
+    for i in range(3):
+        await client.queue.add(dummy_request(i + 1))
+    task = asyncio.create_task(client.process_queue(MagicMock(), batch_size=3))
+    await asyncio.sleep(0.05)
+    if interrupt == "cancel":
+        task.cancel()
+    with pytest.raises(asyncio.CancelledError if interrupt == "cancel" else RuntimeError):
+        await task
+
+    snapshot = client.progress_snapshot()
+    assert (snapshot.in_flight, snapshot.succeeded, snapshot.failed) == (0, 2, 1)
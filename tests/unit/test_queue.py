@@ -1,8 +1,11 @@
 import asyncio
+import time
 
 import pytest
 
-from aiopulse import RequestQueue
+from aiopulse import GenericInputSchema, Request, RequestBuildMapping, RequestFactory, RequestQueue
+from aiopulse.profiling import synthetic_factory, synthetic_payloads
+from aiopulse.queue import PriorityScheduler
 
 
 @pytest.fixture
@@ -30,3 +33,96 @@ class TestQueue:
         queue._deferred_requests[1] = [payload, payload, payload]
         queue._deferred_requests[2] = [payload, {"chain": [payload, payload]}]
         assert queue.total_request_count() == 9
+
+
+@pytest.mark.parametrize("compact", [False, True])
+async def test_add_bulk(compact, monkeypatch):
+    factory = synthetic_factory()
+    payloads = synthetic_payloads(3) + [{"description": "no url"}]
+    payloads[0]["chain"] = synthetic_payloads(2)
+    queue = RequestQueue(compact=compact)
+    # Each chunk is enqueued before the next one is built
+    queued_before = []
+    build_chunks = factory.build_bulk_chunks
+
+    def recording_build(*args):
+        for chunk in build_chunks(*args):
+            queued_before.append(queue.request_count())
+            yield chunk
+
+    monkeypatch.setattr(factory, "build_bulk_chunks", recording_build)
+    errors = await queue.add_bulk(factory, payloads, workers=1, chunk_size=1)
+    assert queued_before == [0, 1, 2, 3]
+    assert [error.index for error in errors] == [3]
+    assert queue.request_count() == 3
+    assert queue.deferred_count() == 2
+    first = queue.get()
+    assert isinstance(first, Request) and first.description == "Synthetic request 0"
+    assert len(queue.get_deferred(first.id)) == 2
+
+
+class TestDeadlines:
+    @pytest.mark.parametrize("compact", [False, True])
+    async def test_chain_inherits_deadline(self, payload, dummy_processor, compact):
+        factory = RequestFactory()
+        factory.register_mapping(
+            RequestBuildMapping(title="Dummy", description="Dummy", input_schema=GenericInputSchema, transformers=[], response_processor=dummy_processor, is_match=lambda data: True)
+        )
+        queue = RequestQueue(compact=compact)
+        await queue.build_and_add(factory, payload | {"deadline": 10, "chain": [payload | {"deadline": 100}, payload]})
+        parent = queue.get()
+        await queue.add_deferred(factory, parent.id)
+        children = [queue.get(), queue.get()]
+        assert all(child.deadline == parent.deadline for child in children)
+        assert parent.deadline <= time.monotonic() + 10
+
+
+class TestPriorityQueue:
+    async def test_priority(self, dummy_request):
+        queue = RequestQueue(priority=True)
+        for id, priority in [(1, 0), (2, 5), (3, 0), (4, 10)]:
+            request = dummy_request(id)
+            request.priority = priority
+            await queue.add(request)
+        assert queue.request_count() == 4
+        assert [queue.get().id for _ in range(4)] == [4, 2, 1, 3]
+        with pytest.raises(asyncio.QueueEmpty):
+            queue.get()
+
+    @pytest.mark.parametrize(
+        "weights, expected_order",
+        [
+            ({}, ["big", "small", "big", "small", "big", "big"]),
+            ({"small": 2}, ["small", "big", "small", "big", "big", "big"]),
+        ],
+    )
+    async def test_fairness(self, dummy_request, weights, expected_order):
+        queue = RequestQueue(priority=True)
+        for flow, weight in weights.items():
+            queue.set_weight(flow, weight)
+        for i, flow in enumerate(["big"] * 4 + ["small"] * 2):
+            request = dummy_request(i)
+            request.mapping_title = flow
+            await queue.add(request)
+        assert [queue.get().mapping_title for _ in range(6)] == expected_order
+
+    async def test_tenant_fairness(self, dummy_request):
+        scheduler = PriorityScheduler(fairness="tenant")
+        for i, tenant in enumerate(["a", "a", "b"]):
+            request = dummy_request(i)
+            request.tenant = tenant
+            scheduler.put_nowait(request)
+        assert [scheduler.get_nowait().tenant for _ in range(3)] == ["a", "b", "a"]
+
+    async def test_chain_first(self, dummy_request):
+        queue = RequestQueue(chain_first=True)
+        await queue.add(dummy_request(1))
+        await queue.add(dummy_request(2))
+        await queue.add(dummy_request(3), chained=True)
+        assert [queue.get().id for _ in range(3)] == [3, 1, 2]
+
+    def test_set_weight(self):
+        with pytest.raises(ValueError):
+            RequestQueue().set_weight("flow", 2)
+        with pytest.raises(ValueError):
+            RequestQueue(priority=True).set_weight("flow", 0)
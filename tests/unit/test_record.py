@@ -0,0 +1,53 @@
+import pytest
+from yarl import URL
+
+from aiopulse import GenericInputSchema, Request, RequestBuildMapping, RequestFactory, RequestQueue
+from aiopulse.record import QueuedRequest
+
+
+@pytest.fixture
+def mapping(dummy_processor):
+    return RequestBuildMapping(title="Dummy", description="Dummy mapping", input_schema=GenericInputSchema, response_processor=dummy_processor, transformers=[], is_match=lambda data: True)
+
+
+class TestQueuedRequest:
+    @pytest.mark.parametrize(
+        "payload",
+        [{}, {"remove_key": "body"}, {"remove_key": "query_params"}],
+        indirect=True,
+    )
+    def test_materialize(self, payload, mapping, dummy_processor):
+        request = Request(**payload, response_processor=dummy_processor)
+        record = QueuedRequest.from_request(request, mapping)
+        materialized = record.materialize()
+        assert materialized.id == request.id
+        assert str(materialized.url) == str(request.url)
+        assert materialized.model_dump() == request.model_dump()
+        assert materialized.query_params == request.query_params
+        assert materialized.response_processor is dummy_processor
+        assert materialized.prepare() == request.prepare()
+        assert type(materialized.prepare()["url"]) is URL
+
+    def test_compact_fields(self, payload, mapping, dummy_processor):
+        del payload["body"]
+        record = QueuedRequest.from_request(Request(**payload, response_processor=dummy_processor), mapping)
+        assert set(record.fields) == {"headers", "query_params"}
+        assert record.host == "www.somehost.com"
+        assert record.method == "post"
+        other = QueuedRequest.from_request(Request(**payload, response_processor=dummy_processor), mapping)
+        assert other.host is record.host
+        assert not hasattr(record, "__dict__")
+
+
+class TestCompactQueue:
+    async def test_build_and_get(self, payload, mapping):
+        factory = RequestFactory()
+        factory.register_mapping(mapping)
+        queue = RequestQueue(compact=True)
+        await queue.build_and_add(factory, payload | {"chain": [payload]})
+        assert isinstance(queue._queue.get_nowait(), QueuedRequest)
+        await queue.build_and_add(factory, payload)
+        request = queue.get()
+        assert isinstance(request, Request)
+        assert str(request.url) == "https://www.somehost.com/somepath?someparam=1&otherparam=2"
+        assert queue.deferred_count() == 1
@@ -5,7 +5,7 @@ from pydantic import ValidationError
 from yarl import URL
 
 from aiopulse import Request
-from aiopulse.data_types import Counter, Method, SerializableURL
+from aiopulse.data_types import MAX_SEQUENCE, MAX_SHARD, SEQUENCE_BITS, Counter, IdAllocator, Method, SerializableURL, parse_url, set_url_cache_size, split_id, url_cache_info, with_query_params
 
 
 @pytest.fixture(autouse=True)
@@ -19,6 +19,45 @@ def test_method_enum():
         Method("blue")
 
 
+def test_id_allocator():
+    first, second = IdAllocator(5, block_size=2), IdAllocator(5, block_size=2)
+    ids = [first(), first(), second(), first(), second()]
+    assert len(set(ids)) == 5
+    assert all(split_id(id)[0] == 5 for id in ids)
+    resumed = IdAllocator(5, start=max(ids) + 100)
+    assert resumed() == max(ids) + 101
+    assert split_id(IdAllocator(6)())[0] == 6
+    assert split_id(IdAllocator(MAX_SHARD)())[0] == MAX_SHARD
+    assert IdAllocator(MAX_SHARD, start=(MAX_SHARD << SEQUENCE_BITS) + MAX_SEQUENCE - 1)() < 2**63
+    for shard in [0, MAX_SHARD + 1]:
+        with pytest.raises(ValueError):
+            IdAllocator(shard)
+
+
+def test_url_cache():
+    set_url_cache_size(8)
+    first = parse_url("https://www.somehost.com/somepath")
+    assert parse_url("https://www.somehost.com/somepath") is first
+    info = url_cache_info()["parse"]
+    assert (info.hits, info.misses, info.maxsize) == (1, 1, 8)
+    set_url_cache_size(1024)
+    assert url_cache_info()["parse"].currsize == 0
+
+
+@pytest.mark.parametrize(
+    "url, params, expected",
+    [
+        ("https://www.somehost.com/somepath", {}, "https://www.somehost.com/somepath"),
+        ("https://www.somehost.com/somepath", {"a": "1 2"}, "https://www.somehost.com/somepath?a=1+2"),
+        ("https://www.somehost.com/somepath?a=0&b=1", {"a": "1"}, "https://www.somehost.com/somepath?a=1&b=1"),
+    ],
+)
+def test_with_query_params(url, params, expected):
+    result = with_query_params(SerializableURL(url), params)
+    assert type(result) is URL
+    assert result == URL(expected)
+
+
 class TestRequest:
     @pytest.mark.parametrize(
         "processor, expectation",
@@ -102,3 +141,25 @@ class TestRequest:
         prepared = req.prepare()
         assert not (prepared.get("json") is not None and prepared.get("data") is not None)
         assert prepared.get(payload_type) == {"some": "thing"}
+
+    @pytest.mark.parametrize(
+        "payload, body",
+        [
+            ({}, b'{"a":1}'),
+            ({"remove_key": "body"}, memoryview(b'{"a":1}')),
+        ],
+        indirect=["payload"],
+    )
+    def test_prepare_encoded_body(self, payload, body, dummy_processor):
+        req = Request(**payload, encoded_body=body, response_processor=dummy_processor)
+        prepared = req.prepare()
+        assert "json" not in prepared
+        assert prepared["data"] is body
+        assert prepared["headers"]["Content-Type"] == "application/json"
+        assert "Content-Type" not in req.headers
+        assert not {"content_type", "compression"} & set(req.model_dump())
+
+    def test_encoded_body_and_form_data(self, payload, dummy_processor):
+        del payload["body"]
+        with pytest.raises(ValidationError):
+            Request(**payload, encoded_body=b"{}", form_data={"a": 1}, response_processor=dummy_processor)
@@ -0,0 +1,52 @@
+import pytest
+from aiohttp import web
+
+from aiopulse import Aiopulse
+from aiopulse.session import SessionConfig, SessionManager
+
+
+@pytest.fixture
+async def server(aiohttp_server):
+    async def handler(request):
+        return web.json_response({})
+
+    app = web.Application()
+    app.router.add_route("*", "/{tail:.*}", handler)
+    return await aiohttp_server(app)
+
+
+class TestSessionManager:
+    async def test_session_reuse(self, loop):
+        manager = SessionManager(SessionConfig(limit=10, limit_per_host=2, ttl_dns_cache=60))
+        session = await manager.get_session()
+        assert await manager.get_session() is session
+        assert session.connector.limit == 10
+        assert session.connector.limit_per_host == 2
+        await manager.close()
+        assert manager.session is None
+        assert session.closed
+        assert await manager.get_session() is not session
+        await manager.close()
+
+    async def test_force_close(self, loop):
+        manager = SessionManager(SessionConfig(force_close=True))
+        session = await manager.get_session()
+        assert session.connector.force_close
+        await manager.close()
+
+    async def test_prewarm(self, server, loop):
+        manager = SessionManager()
+        warmed = await manager.prewarm([server.make_url("/a"), server.make_url("/b"), "relative/path", "http://127.0.0.1:1"])
+        assert warmed == 1
+        await manager.close()
+
+
+class TestClientSession:
+    async def test_known_hosts(self, server, loop):
+        async with Aiopulse(session_config=SessionConfig(prewarm=True)) as client:
+            client.set_transformer_args("Mapping", base_url=str(server.make_url("/api/v1")), other="not a url")
+            assert {str(host) for host in client.factory.known_hosts()} == {str(server.make_url("/"))[:-1]}
+            session = await client.get_session()
+            assert await client.get_session() is session
+            assert await client.process_queue() == []
+        assert session.closed
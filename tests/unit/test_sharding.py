@@ -0,0 +1,102 @@
+import os
+import threading
+import time
+from typing import Any
+
+import pytest
+from aiohttp import web
+
+from aiopulse import Aiopulse, GenericInputSchema, ProcessedResponse, RequestBuildMapping
+from aiopulse.data_types import split_id
+from aiopulse.sharding import ShardedRunner
+
+
+async def pid_processor(response, request) -> ProcessedResponse:
+    return ProcessedResponse(ok=True, status=response.status, content=[{"pid": os.getpid(), "description": request.description}])
+
+
+async def dying_processor(response, request) -> ProcessedResponse:
+    if request.description == "die":
+        os._exit(1)
+    return await pid_processor(response, request)
+
+
+def always_match(data: Any) -> bool:
+    return True
+
+
+@pytest.fixture
+async def server(aiohttp_server):
+    async def handler(request):
+        return web.json_response({})
+
+    app = web.Application()
+    app.router.add_get("/{tail:.*}", handler)
+    return await aiohttp_server(app)
+
+
+@pytest.fixture
+def client() -> Aiopulse:
+    client = Aiopulse()
+    client.register_mapping(
+        RequestBuildMapping(title="Pid", description="Report worker pid", input_schema=GenericInputSchema, transformers=[], response_processor=pid_processor, is_match=always_match)
+    )
+    return client
+
+
+class TestShardedRunner:
+    async def test_run(self, server, client):
+        def payload(name: str, chain: list | None = None) -> dict[str, Any]:
+            return {"description": name, "url": str(server.make_url(f"/{name}")), "method": "GET", "chain": chain}
+
+        payloads = [payload(f"root{i}", chain=[payload(f"child{i}")]) for i in range(4)] + [{"description": "invalid"}]
+        runner = ShardedRunner(client, workers=2)
+        results = [result async for result in runner.run(payloads, batch_size=5, timeout=5)]
+
+        pids = {result.response.content[0]["description"]: result.response.content[0]["pid"] for result in results}
+        assert len(results) == 8
+        assert len(set(pids.values())) == 2
+        assert all(pids[f"root{i}"] == pids[f"child{i}"] for i in range(4))
+        assert len(runner.errors) == 1
+        assert {split_id(result.request.id)[0] for result in results} == {1, 2}
+        assert len({result.request.id for result in results}) == 8
+
+        # A later run, or a new runner resumed from `last_ids`, continues after the ids already used
+        resumed = ShardedRunner(client, workers=2, last_ids=runner.last_ids)
+        more = [result async for result in resumed.run(payloads[:2], batch_size=5, timeout=5)]
+        assert all(result.request.id > runner.last_ids[split_id(result.request.id)[0]] for result in more)
+
+    async def test_streams_input(self, server, client):
+        first_result = threading.Event()
+        waited = []
+
+        def payloads():
+            yield {"description": "first", "url": str(server.make_url("/first")), "method": "GET"}
+            # Input is still being read when the first result comes back
+            waited.append(first_result.wait(timeout=10))
+            yield {"description": "second", "url": str(server.make_url("/second")), "method": "GET"}
+
+        runner = ShardedRunner(client, workers=1, prefetch=1)
+        results = []
+        async for result in runner.run(payloads(), batch_size=1, timeout=5):
+            results.append(result.request.description)
+            first_result.set()
+        assert results == ["first", "second"]
+        assert waited == [True]
+
+    async def test_dead_worker(self, server):
+        client = Aiopulse()
+        client.register_mapping(RequestBuildMapping(title="Die", description="Die", input_schema=GenericInputSchema, transformers=[], response_processor=dying_processor, is_match=always_match))
+        payloads = [{"description": name, "url": str(server.make_url("/")), "method": "GET"} for name in ("die", "live", "live", "live")]
+        runner = ShardedRunner(client, workers=2, poll_interval=0.1)
+        started = time.monotonic()
+        results = [result async for result in runner.run(payloads, batch_size=1, timeout=5)]
+        assert time.monotonic() - started < 20
+        assert any("exited unexpectedly with code 1" in error for error in runner.errors)
+        assert all(result.request.description == "live" for result in results)
+
+    def test_invalid_workers(self, client):
+        with pytest.raises(ValueError):
+            ShardedRunner(client, workers=-1)
+        with pytest.raises(ValueError):
+            ShardedRunner(client, workers=2, first_shard=0)
@@ -3,8 +3,9 @@ from contextlib import nullcontext as does_not_raise
 import pytest
 from pydantic import ValidationError
 
-from aiopulse.data_types import SerializableURL
-from aiopulse.transformer import AddBaseURL
+from aiopulse import GenericInputSchema, InputSchemaBase, RequestBuildMapping, RequestFactory
+from aiopulse.data_types import Method, SerializableURL
+from aiopulse.transformer import AddBaseURL, AddPathToURL, CompiledPipeline, SetHeaders, SetMethod
 
 
 @pytest.fixture
@@ -51,3 +52,77 @@ class TestAddURLTransformer:
             transformed = AddBaseURL(base_url=base_url).transform_input(input_data)
             assert all(key in transformed.keys() for key in input_data.keys())
             assert str(transformed["url"]) == expected_url
+
+
+@pytest.fixture
+def url_transformers():
+    class BaseURL(AddBaseURL):
+        base_url: SerializableURL = SerializableURL("http://www.basedomain.com/api")
+
+    class PathToAdd(AddPathToURL):
+        path_to_add: SerializableURL = SerializableURL("/v1")
+
+    return BaseURL, PathToAdd
+
+
+class TestCompiledPipeline:
+    @pytest.mark.parametrize(
+        "input_data, expected_url",
+        [
+            (None, "http://www.basedomain.com/some/path/v1"),
+            (SerializableURL("endpoint"), "http://www.basedomain.com/some/path/endpoint/v1"),
+        ],
+        indirect=["input_data"],
+    )
+    def test_fused_urls(self, input_data, expected_url):
+        args = {"base_url": "http://www.basedomain.com/some/path", "path_to_add": "/v1"}
+        pipeline = CompiledPipeline([AddBaseURL, AddPathToURL], args)
+        assert len(pipeline.steps) == 1
+        sequential = AddPathToURL(**args).transform_input(AddBaseURL(**args).transform_input(dict(input_data)))
+        transformed = pipeline(input_data)
+        assert str(transformed["url"]) == str(sequential["url"]) == expected_url
+        assert transformed is not input_data
+
+    @pytest.mark.parametrize("url, expected_url", [(None, "http://www.basedomain.com/some/path/v1?page=2"), ("endpoint", "http://www.basedomain.com/some/path/endpoint/v1?page=2")])
+    def test_fused_build_request(self, dummy_processor, url, expected_url):
+        class OptionalUrlSchema(InputSchemaBase):
+            url: SerializableURL | None = None
+            method: Method
+            query_params: dict[str, str] = {}
+
+        factory = RequestFactory()
+        factory.transformer_args = {"base_url": "http://www.basedomain.com/some/path", "path_to_add": "/v1"}
+        mapping = RequestBuildMapping(
+            title="Fused", description="", input_schema=OptionalUrlSchema, transformers=[AddBaseURL, AddPathToURL], response_processor=dummy_processor, is_match=lambda data: True
+        )
+        factory.register_mapping(mapping)
+        assert len(factory.compiled_pipeline(mapping).steps) == 1
+        for _ in range(2):
+            request = factory.build_request({"description": "fused", "url": url, "method": "GET", "query_params": {"page": "2"}})
+            assert str(request.url) == expected_url
+        # The pipeline is recompiled when the arguments are edited in place
+        factory.transformer_args["base_url"] = "http://www.otherdomain.com/api"
+        request = factory.build_request({"description": "fused", "url": url, "method": "GET", "query_params": {"page": "2"}})
+        assert str(request.url) == expected_url.replace("www.basedomain.com/some/path", "www.otherdomain.com/api")
+
+    def test_constant_fields(self, input_data):
+        pipeline = CompiledPipeline([SetMethod, SetHeaders], {"method": "GET", "headers": {"x-a": "1"}})
+        assert len(pipeline.steps) == 1
+        first = pipeline(input_data)
+        first["headers"]["x-b"] = "2"
+        second = pipeline(input_data)
+        assert second == {"some_attr": 1234, "method": Method.GET, "headers": {"x-a": "1"}}
+
+    def test_factory_recompiles(self, url_transformers, dummy_processor):
+        factory = RequestFactory()
+        mapping = RequestBuildMapping(title="Urls", description="", input_schema=GenericInputSchema, transformers=[AddBaseURL], response_processor=dummy_processor, is_match=lambda data: True)
+        factory.register_mapping(mapping)
+        with pytest.raises(ValidationError):
+            factory.compiled_pipeline(mapping)
+        factory.transformer_args = {"base_url": "http://www.basedomain.com"}
+        pipeline = factory.compiled_pipeline(mapping)
+        assert factory.compiled_pipeline(mapping) is pipeline
+        factory.set_transformer_args("Urls", some="arg")
+        assert factory.compiled_pipeline(mapping) is not pipeline
+        mapping.transformers = list(url_transformers)
+        assert len(factory.compiled_pipeline(mapping).steps) == 2
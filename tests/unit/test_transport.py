@@ -0,0 +1,72 @@
+import time
+
+import pytest
+from aiohttp import web
+
+from aiopulse import Aiopulse, GenericInputSchema, ProcessedResponse, RequestBuildMapping
+from aiopulse.response import simple_json_processor
+from aiopulse.transport import RecordingTransport, ReplayTransport
+
+
+def client_with(transport) -> Aiopulse:
+    client = Aiopulse(transport=transport)
+    client.register_mapping(
+        RequestBuildMapping(title="Json", description="Json", input_schema=GenericInputSchema, transformers=[], response_processor=simple_json_processor, is_match=lambda data: True)
+    )
+    return client
+
+
+@pytest.fixture
+async def server(aiohttp_server):
+    async def handler(request):
+        if request.path == "/missing":
+            return web.Response(status=404, reason="Not here")
+        return web.json_response({"path": request.path, "body": await request.json() if request.can_read_body else None})
+
+    app = web.Application()
+    app.router.add_route("*", "/{tail:.*}", handler)
+    return await aiohttp_server(app)
+
+
+@pytest.fixture
+def payloads(server):
+    return [
+        {"description": "get", "url": str(server.make_url("/items")), "method": "GET", "chain": [{"description": "chained", "url": str(server.make_url("/child")), "method": "GET"}]},
+        {"description": "post", "url": str(server.make_url("/items")), "method": "POST", "body": {"name": "a"}},
+        {"description": "missing", "url": str(server.make_url("/missing")), "method": "GET"},
+    ]
+
+
+async def run(client: Aiopulse, payloads) -> dict[str, ProcessedResponse]:
+    for payload in payloads:
+        await client.build_and_add_to_queue(payload)
+    async with client:
+        results = await client.process_queue()
+    return {result.request.description: result.response for result in results}
+
+
+class TestRecordReplay:
+    async def test_replay_matches_recording(self, server, payloads, tmp_path):
+        archive = tmp_path / "traffic.replay"
+        recorded = await run(client_with(RecordingTransport(archive)), payloads)
+        await server.close()
+        replayed = await run(client_with(ReplayTransport(archive)), payloads)
+        assert replayed == recorded
+        assert replayed["post"].content == [{"path": "/items", "body": {"name": "a"}}]
+        assert replayed["chained"].content[0]["path"] == "/child"
+        assert replayed["missing"].ok is False and replayed["missing"].error == "Not here"
+
+    async def test_miss_and_latency(self, server, payloads, tmp_path):
+        archive = tmp_path / "traffic.replay"
+        await run(client_with(RecordingTransport(archive)), payloads[:1])
+        started = time.perf_counter()
+        replayed = await run(client_with(ReplayTransport(archive, latency=0.05)), payloads[1:2] + [payloads[0] | {"chain": None}])
+        assert time.perf_counter() - started >= 0.05
+        assert replayed["get"].ok
+        assert replayed["post"].ok is False and replayed["post"].error.startswith("ReplayMiss")
+
+    def test_incomplete_archive(self, tmp_path):
+        archive = tmp_path / "traffic.replay"
+        archive.write_bytes(b"truncated")
+        with pytest.raises(ValueError):
+            ReplayTransport(archive)